@@ -0,0 +1,225 @@
+"""order list read model
+
+Revision ID: 3f9a7c2d5e18
+Revises: 8c3d6a1f4b27
+Create Date: 2026-10-18 14:05:11
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "3f9a7c2d5e18"
+down_revision: Union[str, Sequence[str], None] = "8c3d6a1f4b27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# One row per order as the orders list shows it: the order, its customer and
+# its items (already in the response shape), so a page is a single-table
+# range scan. The view is the definition; the table is its maintained copy,
+# refreshed per order by triggers and compared against the view by
+# check_read_model.py.
+ORDER_LIST_ROWS_SOURCE = """
+CREATE VIEW order_list_rows_source AS
+SELECT
+    o.id AS order_id,
+    o.user_id,
+    o.status,
+    o.total,
+    o.created_at,
+    u.name AS user_name,
+    u.email AS user_email,
+    COUNT(oi.id)::int AS item_count,
+    COALESCE(
+        jsonb_agg(
+            jsonb_build_object(
+                'order_item_id', oi.id,
+                'qty', oi.qty,
+                'unit_price', oi.unit_price::float8,
+                'product', jsonb_build_object('product_id', p.id, 'title', p.title, 'sku', p.sku)
+            )
+            ORDER BY oi.id
+        ) FILTER (WHERE oi.id IS NOT NULL),
+        '[]'::jsonb
+    ) AS items
+FROM orders o
+JOIN users u ON u.id = o.user_id
+LEFT JOIN order_items oi ON oi.order_id = o.id
+LEFT JOIN products p ON p.id = oi.product_id
+GROUP BY o.id, u.id
+"""
+
+# Two transactions adding items to the same order would otherwise each
+# rebuild the row from a snapshot missing the other's item, and the later
+# upsert would win. Locking the orders first (NO KEY UPDATE, so foreign key
+# checks on order_items don't conflict) queues them, and the upsert then runs
+# with a snapshot taken after the earlier one committed.
+ORDER_LIST_ROWS_REFRESH = """
+CREATE FUNCTION order_list_rows_refresh(ids int[])
+RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF cardinality(ids) = 0 THEN
+        RETURN;
+    END IF;
+
+    PERFORM 1 FROM orders WHERE id = ANY(ids) ORDER BY id FOR NO KEY UPDATE;
+
+    INSERT INTO order_list_rows
+    SELECT * FROM order_list_rows_source WHERE order_id = ANY(ids)
+    ON CONFLICT (order_id) DO UPDATE
+    SET user_id = EXCLUDED.user_id,
+        status = EXCLUDED.status,
+        total = EXCLUDED.total,
+        created_at = EXCLUDED.created_at,
+        user_name = EXCLUDED.user_name,
+        user_email = EXCLUDED.user_email,
+        item_count = EXCLUDED.item_count,
+        items = EXCLUDED.items;
+END
+$$
+"""
+
+# Writes to orders and order_items are statement-level with transition
+# tables (a batch status update refreshes its orders in one statement);
+# customer and product renames are row-level and fan out to their orders.
+TRIGGER_FUNCTIONS = {
+    "order_list_rows_orders_inserted": "PERFORM order_list_rows_refresh(ARRAY(SELECT id FROM changed));",
+    "order_list_rows_orders_deleted": "DELETE FROM order_list_rows WHERE order_id IN (SELECT id FROM changed);",
+    "order_list_rows_orders_updated": """
+        PERFORM order_list_rows_refresh(ARRAY(
+            SELECT n.id
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            WHERE (n.user_id, n.status, n.total, n.created_at)
+                IS DISTINCT FROM (o.user_id, o.status, o.total, o.created_at)
+        ));
+    """,
+    "order_list_rows_items_changed": (
+        "PERFORM order_list_rows_refresh(ARRAY(SELECT DISTINCT order_id FROM changed));"
+    ),
+    "order_list_rows_items_updated": """
+        PERFORM order_list_rows_refresh(ARRAY(
+            SELECT order_id FROM new_rows
+            UNION
+            SELECT order_id FROM old_rows
+        ));
+    """,
+    "order_list_rows_user_updated": (
+        "PERFORM order_list_rows_refresh(ARRAY(SELECT id FROM orders WHERE user_id = NEW.id));"
+    ),
+    "order_list_rows_product_updated": (
+        "PERFORM order_list_rows_refresh(ARRAY(SELECT DISTINCT order_id FROM order_items WHERE product_id = NEW.id));"
+    ),
+}
+
+# (name, event, table, options, function)
+TRIGGERS = [
+    ("orders_list_rows_insert", "AFTER INSERT", "orders",
+     "REFERENCING NEW TABLE AS changed FOR EACH STATEMENT", "order_list_rows_orders_inserted"),
+    ("orders_list_rows_delete", "AFTER DELETE", "orders",
+     "REFERENCING OLD TABLE AS changed FOR EACH STATEMENT", "order_list_rows_orders_deleted"),
+    ("orders_list_rows_update", "AFTER UPDATE", "orders",
+     "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT",
+     "order_list_rows_orders_updated"),
+    ("order_items_list_rows_insert", "AFTER INSERT", "order_items",
+     "REFERENCING NEW TABLE AS changed FOR EACH STATEMENT", "order_list_rows_items_changed"),
+    ("order_items_list_rows_delete", "AFTER DELETE", "order_items",
+     "REFERENCING OLD TABLE AS changed FOR EACH STATEMENT", "order_list_rows_items_changed"),
+    ("order_items_list_rows_update", "AFTER UPDATE", "order_items",
+     "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT",
+     "order_list_rows_items_updated"),
+    ("users_list_rows_update", "AFTER UPDATE OF email, name", "users",
+     "FOR EACH ROW WHEN (OLD.email IS DISTINCT FROM NEW.email OR OLD.name IS DISTINCT FROM NEW.name)",
+     "order_list_rows_user_updated"),
+    ("products_list_rows_update", "AFTER UPDATE OF sku, title", "products",
+     "FOR EACH ROW WHEN (OLD.sku IS DISTINCT FROM NEW.sku OR OLD.title IS DISTINCT FROM NEW.title)",
+     "order_list_rows_product_updated"),
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "order_list_rows",
+        sa.Column("order_id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, nullable=False),
+        sa.Column("status", sa.String(32), nullable=False),
+        sa.Column("total", sa.Integer, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True)),
+        sa.Column("user_name", sa.String(255), nullable=False),
+        sa.Column("user_email", sa.String(255), nullable=False),
+        sa.Column("item_count", sa.Integer, nullable=False),
+        sa.Column("items", postgresql.JSONB, nullable=False),
+    )
+
+    op.execute(ORDER_LIST_ROWS_SOURCE)
+    op.execute(ORDER_LIST_ROWS_REFRESH)
+
+    for name, body in TRIGGER_FUNCTIONS.items():
+        op.execute(f"""
+            CREATE FUNCTION {name}() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                {body}
+                RETURN NULL;
+            END
+            $$
+        """)
+
+    for name, event, table, options, function in TRIGGERS:
+        op.execute(f"CREATE TRIGGER {name} {event} ON {table} {options} EXECUTE FUNCTION {function}()")
+
+    # backfill before indexing, one pass instead of index maintenance per row
+    op.execute("INSERT INTO order_list_rows SELECT * FROM order_list_rows_source")
+
+    # --- concurrent indexes MUST be outside transaction ---
+    # one (sort key, order_id) index per SORT_COLUMNS entry; order_id itself
+    # is the primary key
+    with op.get_context().autocommit_block():
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_list_rows_created_at
+            ON order_list_rows (created_at, order_id)
+        """)
+
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_list_rows_status
+            ON order_list_rows (status, order_id)
+        """)
+
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_list_rows_total
+            ON order_list_rows (total, order_id)
+        """)
+
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_list_rows_user_name
+            ON order_list_rows (user_name, order_id)
+        """)
+
+        # status filter with the default sort
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_list_rows_status_created_at
+            ON order_list_rows (status, created_at, order_id)
+        """)
+
+        # customer name search
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_list_rows_user_name_trgm
+            ON order_list_rows USING gin (user_name gin_trgm_ops)
+        """)
+
+
+def downgrade() -> None:
+    for name, _, table, _, _ in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+
+    for name in TRIGGER_FUNCTIONS:
+        op.execute(f"DROP FUNCTION IF EXISTS {name}()")
+
+    op.execute("DROP FUNCTION IF EXISTS order_list_rows_refresh(int[])")
+    op.execute("DROP VIEW IF EXISTS order_list_rows_source")
+    op.drop_table("order_list_rows")
@@ -0,0 +1,47 @@
+"""users search and paging indexes
+
+Revision ID: 5b8e2f1c9a47
+Revises: 03154b06e08a
+Create Date: 2026-01-12 10:04:31
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "5b8e2f1c9a47"
+down_revision: Union[str, Sequence[str], None] = "03154b06e08a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # --- concurrent indexes MUST be outside transaction ---
+    with op.get_context().autocommit_block():
+        # email ILIKE '%..%' search
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_email_trgm
+            ON users USING gin (email gin_trgm_ops)
+        """)
+
+        # keyset paging on (column, id); id and email are already covered
+        # by the primary key and the unique email index
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_created_at_id
+            ON users (created_at, id)
+        """)
+
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_name_id
+            ON users (name, id)
+        """)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_users_name_id")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_users_created_at_id")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_users_email_trgm")
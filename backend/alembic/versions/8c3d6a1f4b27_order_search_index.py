@@ -0,0 +1,189 @@
+"""order search index
+
+Revision ID: 8c3d6a1f4b27
+Revises: 5b8e2f1c9a47
+Create Date: 2026-10-18 09:12:40
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "8c3d6a1f4b27"
+down_revision: Union[str, Sequence[str], None] = "5b8e2f1c9a47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# One search row per order: the order id, the customer's email and name and
+# every product SKU/title on it, as a weighted tsvector (A: order id, B:
+# customer, C: products) for ranked prefix matching, and as lowercased text
+# for trigram infix matching. Triggers keep it in step with all four tables.
+ORDER_SEARCH_ROWS = """
+CREATE FUNCTION order_search_rows(ids int[])
+RETURNS TABLE (order_id int, document tsvector, search_text text)
+LANGUAGE sql STABLE AS $$
+    SELECT
+        o.id,
+        setweight(to_tsvector('simple', o.id::text), 'A')
+            || setweight(to_tsvector('simple', u.email || ' ' || u.name), 'B')
+            || setweight(to_tsvector('simple', coalesce(string_agg(DISTINCT p.sku || ' ' || p.title, ' '), '')), 'C'),
+        lower(concat_ws(' ', o.id, u.email, u.name, string_agg(DISTINCT p.sku || ' ' || p.title, ' ')))
+    FROM orders o
+    JOIN users u ON u.id = o.user_id
+    LEFT JOIN order_items oi ON oi.order_id = o.id
+    LEFT JOIN products p ON p.id = oi.product_id
+    WHERE ids IS NULL OR o.id = ANY(ids)
+    GROUP BY o.id, u.email, u.name
+$$
+"""
+
+ORDER_SEARCH_REFRESH = """
+CREATE FUNCTION order_search_refresh(ids int[])
+RETURNS void
+LANGUAGE sql AS $$
+    INSERT INTO order_search (order_id, document, search_text)
+    SELECT * FROM order_search_rows(ids)
+    ON CONFLICT (order_id) DO UPDATE
+    SET document = EXCLUDED.document, search_text = EXCLUDED.search_text
+$$
+"""
+
+# Inserts and deletes are statement-level with transition tables, so a bulk
+# insert refreshes its orders in one set-based statement. The rarer updates
+# are row-level and only fire when a searchable column is in the SET list.
+TRIGGER_FUNCTIONS = {
+    "order_search_orders_inserted": "PERFORM order_search_refresh(ARRAY(SELECT id FROM changed));",
+    "order_search_orders_deleted": "DELETE FROM order_search WHERE order_id IN (SELECT id FROM changed);",
+    "order_search_items_changed": "PERFORM order_search_refresh(ARRAY(SELECT DISTINCT order_id FROM changed));",
+    "order_search_order_updated": "PERFORM order_search_refresh(ARRAY[NEW.id]);",
+    "order_search_item_updated": "PERFORM order_search_refresh(ARRAY[NEW.order_id, OLD.order_id]);",
+    "order_search_user_updated": (
+        "PERFORM order_search_refresh(ARRAY(SELECT id FROM orders WHERE user_id = NEW.id));"
+    ),
+    "order_search_product_updated": (
+        "PERFORM order_search_refresh(ARRAY(SELECT DISTINCT order_id FROM order_items WHERE product_id = NEW.id));"
+    ),
+}
+
+# (name, event, table, options, function)
+TRIGGERS = [
+    ("orders_search_insert", "AFTER INSERT", "orders",
+     "REFERENCING NEW TABLE AS changed FOR EACH STATEMENT", "order_search_orders_inserted"),
+    ("orders_search_delete", "AFTER DELETE", "orders",
+     "REFERENCING OLD TABLE AS changed FOR EACH STATEMENT", "order_search_orders_deleted"),
+    ("orders_search_update", "AFTER UPDATE OF user_id", "orders",
+     "FOR EACH ROW WHEN (OLD.user_id IS DISTINCT FROM NEW.user_id)", "order_search_order_updated"),
+    ("order_items_search_insert", "AFTER INSERT", "order_items",
+     "REFERENCING NEW TABLE AS changed FOR EACH STATEMENT", "order_search_items_changed"),
+    ("order_items_search_delete", "AFTER DELETE", "order_items",
+     "REFERENCING OLD TABLE AS changed FOR EACH STATEMENT", "order_search_items_changed"),
+    ("order_items_search_update", "AFTER UPDATE OF order_id, product_id", "order_items",
+     "FOR EACH ROW WHEN (OLD.order_id IS DISTINCT FROM NEW.order_id OR OLD.product_id IS DISTINCT FROM NEW.product_id)",
+     "order_search_item_updated"),
+    ("users_search_update", "AFTER UPDATE OF email, name", "users",
+     "FOR EACH ROW WHEN (OLD.email IS DISTINCT FROM NEW.email OR OLD.name IS DISTINCT FROM NEW.name)",
+     "order_search_user_updated"),
+    ("products_search_update", "AFTER UPDATE OF sku, title", "products",
+     "FOR EACH ROW WHEN (OLD.sku IS DISTINCT FROM NEW.sku OR OLD.title IS DISTINCT FROM NEW.title)",
+     "order_search_product_updated"),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.create_table(
+        "order_search",
+        sa.Column("order_id", sa.Integer, primary_key=True),
+        sa.Column("document", postgresql.TSVECTOR, nullable=False),
+        sa.Column("search_text", sa.Text, nullable=False),
+    )
+
+    op.execute(ORDER_SEARCH_ROWS)
+    op.execute(ORDER_SEARCH_REFRESH)
+
+    for name, body in TRIGGER_FUNCTIONS.items():
+        op.execute(f"""
+            CREATE FUNCTION {name}() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                {body}
+                RETURN NULL;
+            END
+            $$
+        """)
+
+    for name, event, table, options, function in TRIGGERS:
+        op.execute(f"CREATE TRIGGER {name} {event} ON {table} {options} EXECUTE FUNCTION {function}()")
+
+    # backfill before indexing, one pass instead of index maintenance per row
+    op.execute("INSERT INTO order_search SELECT * FROM order_search_rows(NULL)")
+
+    # --- concurrent indexes MUST be outside transaction ---
+    with op.get_context().autocommit_block():
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_search_document
+            ON order_search USING gin (document)
+        """)
+
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_search_text_trgm
+            ON order_search USING gin (search_text gin_trgm_ops)
+        """)
+
+        # /api/search on products; users already have email/name trigram
+        # indexes
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_title_trgm
+            ON products USING gin (title gin_trgm_ops)
+        """)
+
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_sku_trgm
+            ON products USING gin (sku gin_trgm_ops)
+        """)
+
+        # prefix fallback for tokens too short for trigrams
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_email_prefix
+            ON users (lower(email) text_pattern_ops)
+        """)
+
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_name_prefix
+            ON users (lower(name) text_pattern_ops)
+        """)
+
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_sku_prefix
+            ON products (lower(sku) text_pattern_ops)
+        """)
+
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_title_prefix
+            ON products (lower(title) text_pattern_ops)
+        """)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_products_title_prefix")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_products_sku_prefix")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_users_name_prefix")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_users_email_prefix")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_products_sku_trgm")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_products_title_trgm")
+
+    for name, _, table, _, _ in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+
+    for name in TRIGGER_FUNCTIONS:
+        op.execute(f"DROP FUNCTION IF EXISTS {name}()")
+
+    op.execute("DROP FUNCTION IF EXISTS order_search_refresh(int[])")
+    op.execute("DROP FUNCTION IF EXISTS order_search_rows(int[])")
+    op.drop_table("order_search")
@@ -0,0 +1,223 @@
+"""partition orders by month
+
+Revision ID: b6e1d4a9c3f2
+Revises: 3f9a7c2d5e18
+Create Date: 2026-10-18 16:20:43
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.partitions import (
+    PARTITION_MONTHS_AHEAD,
+    PARTITIONED_TABLES,
+    add_months,
+    create_partition_sql,
+    current_month,
+    month_start,
+    months,
+)
+
+
+revision: str = "b6e1d4a9c3f2"
+down_revision: Union[str, Sequence[str], None] = "3f9a7c2d5e18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# orders and order_items become range partitioned by created_at month. A
+# partitioned table's primary key must include the partition key, so both
+# keys become (id, created_at), and order_items gets its order's created_at
+# so that the foreign key (order_id, created_at) keeps an item in the same
+# month as its order and joins on both columns prune to one partition.
+#
+# Both tables are rebuilt: the old ones are renamed, the new ones created and
+# filled, and the secondary indexes and triggers defined on the old ones by
+# earlier migrations are read from the catalog and recreated. This
+# rewrites every row under an exclusive lock; run it in a maintenance window.
+
+ORDERS_COLUMNS = """
+    id integer NOT NULL DEFAULT nextval('{sequence}'::regclass),
+    user_id integer NOT NULL,
+    status varchar(32) NOT NULL,
+    total integer NOT NULL,
+    created_at timestamptz NOT NULL DEFAULT now()
+"""
+
+ORDER_ITEMS_COLUMNS = """
+    id integer NOT NULL DEFAULT nextval('{sequence}'::regclass),
+    order_id integer NOT NULL,
+    product_id integer NOT NULL,
+    qty integer NOT NULL,
+    unit_price integer NOT NULL{created_at}
+"""
+
+PARTITIONED_CONSTRAINTS = [
+    "ALTER TABLE orders ADD CONSTRAINT orders_pkey PRIMARY KEY (id, created_at)",
+    "ALTER TABLE orders ADD CONSTRAINT orders_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id)",
+    "ALTER TABLE order_items ADD CONSTRAINT order_items_pkey PRIMARY KEY (id, created_at)",
+    "ALTER TABLE order_items ADD CONSTRAINT order_items_order_id_fkey "
+    "FOREIGN KEY (order_id, created_at) REFERENCES orders (id, created_at)",
+    "ALTER TABLE order_items ADD CONSTRAINT order_items_product_id_fkey "
+    "FOREIGN KEY (product_id) REFERENCES products (id)",
+]
+
+UNPARTITIONED_CONSTRAINTS = [
+    "ALTER TABLE orders ADD CONSTRAINT orders_pkey PRIMARY KEY (id)",
+    "ALTER TABLE orders ADD CONSTRAINT orders_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id)",
+    "ALTER TABLE order_items ADD CONSTRAINT order_items_pkey PRIMARY KEY (id)",
+    "ALTER TABLE order_items ADD CONSTRAINT order_items_order_id_fkey "
+    "FOREIGN KEY (order_id) REFERENCES orders (id)",
+    "ALTER TABLE order_items ADD CONSTRAINT order_items_product_id_fkey "
+    "FOREIGN KEY (product_id) REFERENCES products (id)",
+]
+
+# The search rows function and the read model view group by o.id, which
+# only covers the other order columns while id alone is the primary key, so
+# both are redefined for each layout (and join items on both key columns).
+ORDER_SEARCH_ROWS = """
+CREATE OR REPLACE FUNCTION order_search_rows(ids int[])
+RETURNS TABLE (order_id int, document tsvector, search_text text)
+LANGUAGE sql STABLE AS $$
+    SELECT
+        o.id,
+        setweight(to_tsvector('simple', o.id::text), 'A')
+            || setweight(to_tsvector('simple', u.email || ' ' || u.name), 'B')
+            || setweight(to_tsvector('simple', coalesce(string_agg(DISTINCT p.sku || ' ' || p.title, ' '), '')), 'C'),
+        lower(concat_ws(' ', o.id, u.email, u.name, string_agg(DISTINCT p.sku || ' ' || p.title, ' ')))
+    FROM orders o
+    JOIN users u ON u.id = o.user_id
+    LEFT JOIN order_items oi ON {item_join}
+    LEFT JOIN products p ON p.id = oi.product_id
+    WHERE ids IS NULL OR o.id = ANY(ids)
+    GROUP BY {order_key}, u.email, u.name
+$$
+"""
+
+ORDER_LIST_ROWS_SOURCE = """
+CREATE VIEW order_list_rows_source AS
+SELECT
+    o.id AS order_id,
+    o.user_id,
+    o.status,
+    o.total,
+    o.created_at,
+    u.name AS user_name,
+    u.email AS user_email,
+    COUNT(oi.id)::int AS item_count,
+    COALESCE(
+        jsonb_agg(
+            jsonb_build_object(
+                'order_item_id', oi.id,
+                'qty', oi.qty,
+                'unit_price', oi.unit_price::float8,
+                'product', jsonb_build_object('product_id', p.id, 'title', p.title, 'sku', p.sku)
+            )
+            ORDER BY oi.id
+        ) FILTER (WHERE oi.id IS NOT NULL),
+        '[]'::jsonb
+    ) AS items
+FROM orders o
+JOIN users u ON u.id = o.user_id
+LEFT JOIN order_items oi ON {item_join}
+LEFT JOIN products p ON p.id = oi.product_id
+GROUP BY {order_key}, u.id
+"""
+
+# search and read model triggers
+TRIGGERS_SQL = """
+    SELECT pg_get_triggerdef(oid)
+    FROM pg_trigger
+    WHERE tgrelid = ANY(CAST(:tables AS regclass[])) AND NOT tgisinternal
+"""
+
+# everything but the primary keys; on a partitioned table these are the
+# parent's indexes, defined ON ONLY the parent
+INDEXES_SQL = """
+    SELECT replace(pg_get_indexdef(i.indexrelid), ' ON ONLY ', ' ON ')
+    FROM pg_index i
+    WHERE i.indrelid = ANY(CAST(:tables AS regclass[]))
+      AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+"""
+
+
+def _rebuild(partitioned: bool):
+    conn = op.get_bind()
+    params = {"tables": PARTITIONED_TABLES}
+
+    triggers = conn.execute(sa.text(TRIGGERS_SQL), params).scalars().all()
+    indexes = conn.execute(sa.text(INDEXES_SQL), params).scalars().all()
+    sequences = {
+        table: conn.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}).scalar_one()
+        for table in PARTITIONED_TABLES
+    }
+
+    # the view would follow the old table through the rename
+    op.execute("DROP VIEW order_list_rows_source")
+
+    # indexes and constraints keep their names through the rename, so they
+    # are dropped with the old tables before being created on the new ones
+    for table in PARTITIONED_TABLES:
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+
+    partition_by = " PARTITION BY RANGE (created_at)" if partitioned else ""
+    op.execute(
+        f"CREATE TABLE orders ({ORDERS_COLUMNS.format(sequence=sequences['orders'])}){partition_by}"
+    )
+    op.execute(
+        "CREATE TABLE order_items ("
+        + ORDER_ITEMS_COLUMNS.format(
+            sequence=sequences["order_items"],
+            created_at=",\n    created_at timestamptz NOT NULL" if partitioned else "",
+        )
+        + f"){partition_by}"
+    )
+
+    if partitioned:
+        first = conn.execute(sa.text("SELECT MIN(created_at) FROM orders_old")).scalar()
+        first = month_start(first) if first is not None else current_month()
+        for month in months(first, add_months(current_month(), PARTITION_MONTHS_AHEAD)):
+            for table in PARTITIONED_TABLES:
+                op.execute(create_partition_sql(table, month))
+
+        op.execute("INSERT INTO orders SELECT id, user_id, status, total, created_at FROM orders_old")
+        op.execute("""
+            INSERT INTO order_items
+            SELECT oi.id, oi.order_id, oi.product_id, oi.qty, oi.unit_price, o.created_at
+            FROM order_items_old oi
+            JOIN orders_old o ON o.id = oi.order_id
+        """)
+    else:
+        op.execute("INSERT INTO orders SELECT id, user_id, status, total, created_at FROM orders_old")
+        op.execute("INSERT INTO order_items SELECT id, order_id, product_id, qty, unit_price FROM order_items_old")
+
+    # the sequences belong to the old id columns and would go with them
+    for table, sequence in sequences.items():
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+
+    for table in reversed(PARTITIONED_TABLES):
+        op.execute(f"DROP TABLE {table}_old")
+
+    for statement in PARTITIONED_CONSTRAINTS if partitioned else UNPARTITIONED_CONSTRAINTS:
+        op.execute(statement)
+    for statement in [*indexes, *triggers]:
+        op.execute(statement)
+
+    if partitioned:
+        keys = {"item_join": "oi.order_id = o.id AND oi.created_at = o.created_at", "order_key": "o.id, o.created_at"}
+    else:
+        keys = {"item_join": "oi.order_id = o.id", "order_key": "o.id"}
+    op.execute(ORDER_SEARCH_ROWS.format(**keys))
+    op.execute(ORDER_LIST_ROWS_SOURCE.format(**keys))
+
+    op.execute("ANALYZE orders, order_items")
+
+
+def upgrade() -> None:
+    _rebuild(partitioned=True)
+
+
+def downgrade() -> None:
+    _rebuild(partitioned=False)
@@ -0,0 +1,64 @@
+"""checkout
+
+Revision ID: c8f2a5d1e6b3
+Revises: b6e1d4a9c3f2
+Create Date: 2026-10-18 18:42:07
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "c8f2a5d1e6b3"
+down_revision: Union[str, Sequence[str], None] = "b6e1d4a9c3f2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Checkout turns a user's cart_items into an order. The model has always had
+# a qty per cart row but the table never did; existing rows count as one.
+#
+# checkout_requests records each (user, Idempotency-Key) a checkout was made
+# with and the order it created, so a retried request returns that order
+# instead of placing another. Stock may never go negative, whatever writes it.
+def upgrade() -> None:
+    op.add_column(
+        "cart_items",
+        sa.Column("qty", sa.Integer, nullable=False, server_default="1"),
+    )
+    op.create_check_constraint("cart_items_qty_positive", "cart_items", "qty > 0")
+
+    # added NOT VALID here and validated below, after the commit
+    op.execute("ALTER TABLE products ADD CONSTRAINT products_stock_nonnegative CHECK (stock >= 0) NOT VALID")
+
+    op.create_table(
+        "checkout_requests",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("idempotency_key", sa.String(255), primary_key=True),
+        # orders' primary key; no foreign key, so order partitions stay
+        # detachable
+        sa.Column("order_id", sa.Integer),
+        sa.Column("order_created_at", sa.DateTime(timezone=True)),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+
+    # --- validation MUST follow the commit ---
+    # ADD CONSTRAINT took ACCESS EXCLUSIVE on products until its transaction
+    # ends; VALIDATE scans under SHARE UPDATE EXCLUSIVE, so reads and writes
+    # carry on meanwhile
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE products VALIDATE CONSTRAINT products_stock_nonnegative")
+
+
+def downgrade() -> None:
+    op.drop_table("checkout_requests")
+    op.drop_constraint("products_stock_nonnegative", "products", type_="check")
+    op.drop_constraint("cart_items_qty_positive", "cart_items", type_="check")
+    op.drop_column("cart_items", "qty")
@@ -0,0 +1,200 @@
+import asyncio
+import math
+import time
+from collections import deque
+
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.metrics import ADMISSION_ACTIVE, ADMISSION_QUEUED, ADMISSION_REQUESTS, ADMISSION_WAIT_SECONDS
+from app.db.session import PoolBusy, pool_deadline, pool_saturated
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """Bounds how many requests of one route class run at once.
+
+    Up to `limit` run; up to `queue` more wait in arrival order, each for at
+    most `max_wait` seconds, and the rest are turned away with a 429. Nothing
+    is admitted while the pool the class draws from has no free connection:
+    the request would only wait there instead, holding its slot, until the
+    pool timeout. With `cached`, most requests never take a connection, so
+    they are admitted anyway and only one opening a session waits for a free
+    connection, within what is left of `max_wait` (wait_for_pool). A request
+    that can't expect a slot within `max_wait` (queue position times the
+    recent service time, per slot) gets a 503 at once rather than after
+    waiting for nothing. Rejections carry a Retry-After of the expected wait.
+    """
+
+    def __init__(self, name: str, limit: int, queue: int, max_wait: float, read: bool, cached: bool = False):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.max_wait = max_wait
+        self.read = read
+        self.cached = cached
+        self.active = 0
+        self._waiters: deque[asyncio.Event] = deque()
+        # moving average of admitted requests' duration, seconds
+        self._service_time = 0.05
+
+    def _can_start(self) -> bool:
+        return self.active < self.limit and (self.cached or not pool_saturated(self.read))
+
+    def _expected_wait(self, position: int) -> float:
+        return position * self._service_time / self.limit
+
+    def _rejection(self, status_code: int, result: str, detail: str) -> Rejected:
+        ADMISSION_REQUESTS.labels(self.name, result).inc()
+        retry_after = max(1, math.ceil(self._expected_wait(len(self._waiters) + 1)))
+        return Rejected(status_code, detail, retry_after)
+
+    def _reject(self, status_code: int, result: str, detail: str):
+        raise self._rejection(status_code, result, detail)
+
+    def _start(self, started: float):
+        self.active += 1
+        ADMISSION_ACTIVE.labels(self.name).set(self.active)
+        ADMISSION_REQUESTS.labels(self.name, "admitted").inc()
+        ADMISSION_WAIT_SECONDS.labels(self.name).observe(time.monotonic() - started)
+
+    async def acquire(self):
+        """Wait for a slot; raises Rejected."""
+        started = time.monotonic()
+        if not self._waiters and self._can_start():
+            self._start(started)
+            return
+
+        if len(self._waiters) >= self.queue:
+            self._reject(429, "queue_full", "Too many requests, retry later")
+        if self._expected_wait(len(self._waiters) + 1) > self.max_wait:
+            self._reject(503, "deadline", "Server busy, retry later")
+
+        waiter = asyncio.Event()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUED.labels(self.name).set(len(self._waiters))
+        deadline = started + self.max_wait
+
+        try:
+            while not (self._waiters[0] is waiter and self._can_start()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._reject(503, "timeout", "Server busy, retry later")
+
+                # the head is woken by a release, but connections also come
+                # back from other classes and background work, so poll too
+                waiter.clear()
+                try:
+                    await asyncio.wait_for(waiter.wait(), min(remaining, settings.ADMISSION_POLL_INTERVAL))
+                except asyncio.TimeoutError:
+                    pass
+
+            self._start(started)
+        finally:
+            self._waiters.remove(waiter)
+            ADMISSION_QUEUED.labels(self.name).set(len(self._waiters))
+            if self._waiters:
+                self._waiters[0].set()
+
+    def release(self, duration: float):
+        self.active -= 1
+        ADMISSION_ACTIVE.labels(self.name).set(self.active)
+        self._service_time += 0.2 * (duration - self._service_time)
+        if self._waiters:
+            self._waiters[0].set()
+
+
+def route_class(method: str, path: str) -> str | None:
+    """list, export or write; None for what isn't limited (health checks,
+    metrics, docs)."""
+    if not path.startswith("/api/"):
+        return None
+    if path.rstrip("/").endswith("/export"):
+        return "export"
+    # batch-get is a read that takes its ids in a body
+    if method in ("GET", "HEAD") or path.rstrip("/").endswith("/batch-get"):
+        return "list"
+    return "write"
+
+
+def default_limiters() -> dict[str, AdmissionLimiter]:
+    # lists read from the replica when there is one, and mostly from the
+    # cache; exports and writes from the primary
+    return {
+        "list": AdmissionLimiter(
+            "list",
+            settings.ADMISSION_LIST_CONCURRENCY,
+            settings.ADMISSION_LIST_QUEUE,
+            settings.ADMISSION_LIST_MAX_WAIT,
+            read=True,
+            cached=True,
+        ),
+        "export": AdmissionLimiter(
+            "export",
+            settings.ADMISSION_EXPORT_CONCURRENCY,
+            settings.ADMISSION_EXPORT_QUEUE,
+            settings.ADMISSION_EXPORT_MAX_WAIT,
+            read=False,
+        ),
+        "write": AdmissionLimiter(
+            "write",
+            settings.ADMISSION_WRITE_CONCURRENCY,
+            settings.ADMISSION_WRITE_QUEUE,
+            settings.ADMISSION_WRITE_MAX_WAIT,
+            read=False,
+        ),
+    }
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying an AdmissionLimiter per route class.
+
+    A slot is held until the response has been sent, including a streamed
+    export. Requests are classified by method and path, before routing.
+    """
+
+    def __init__(self, app, limiters: dict[str, AdmissionLimiter] | None = None):
+        self.app = app
+        self.limiters = default_limiters() if limiters is None else limiters
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.ADMISSION_CONTROL:
+            return await self.app(scope, receive, send)
+
+        limiter = self.limiters.get(route_class(scope["method"], scope["path"]))
+        if limiter is None:
+            return await self.app(scope, receive, send)
+
+        deadline = time.monotonic() + limiter.max_wait
+        try:
+            await limiter.acquire()
+        except Rejected as e:
+            return await self._rejected(e, scope, receive, send)
+
+        start = time.perf_counter()
+        token = pool_deadline.set(deadline) if limiter.cached else None
+        try:
+            await self.app(scope, receive, send)
+        except PoolBusy:
+            # raised before a session was opened, so nothing has been sent yet
+            e = limiter._rejection(503, "pool_timeout", "Server busy, retry later")
+            await self._rejected(e, scope, receive, send)
+        finally:
+            if token is not None:
+                pool_deadline.reset(token)
+            limiter.release(time.perf_counter() - start)
+
+    async def _rejected(self, e: Rejected, scope, receive, send):
+        response = JSONResponse(
+            {"detail": e.detail},
+            status_code=e.status_code,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+        await response(scope, receive, send)
@@ -2,7 +2,79 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "postgresql+asyncpg://postgres:postgres@db:5432/admin_db"
+    # Optional streaming replica for read-only endpoints; unset means reads
+    # go to the primary
+    READ_DATABASE_URL: str | None = None
+    READ_REPLICA_MAX_LAG: float = 5.0
+    READ_REPLICA_CHECK_INTERVAL: float = 2.0
+    READ_REPLICA_CHECK_TIMEOUT: float = 1.0
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = False
     REDIS_URL: str = "redis://redis:6379/0"
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_TIMEOUT: float = 0.25
+    REDIS_RETRY_AFTER: float = 5.0
+    ORDERS_LIST_CACHE_TTL: int = 600
+    ORDERS_LIST_STALE_TTL: int = 300
+    ORDERS_DETAIL_CACHE_TTL: int = 300
+    # Users lists aren't versioned: cached totals and pages only age out.
+    # Pages embed order stats (include=stats), which every checkout changes,
+    # hence the shorter TTL; for USERS_LIST_STALE_TTL seconds
+    # after it a page is still served while it is refreshed in the background
+    USERS_COUNT_CACHE_TTL: int = 60
+    USERS_LIST_CACHE_TTL: int = 30
+    USERS_LIST_STALE_TTL: int = 300
+    ORDERS_SQL_JSON: bool = False
+    # Serve orders lists from the order_list_rows read model
+    ORDERS_READ_MODEL: bool = False
+    # Orders list pages computed at startup: the first ORDERS_PREWARM_PAGES
+    # pages of every sort, unfiltered and per status (0 disables)
+    ORDERS_PREWARM_PAGES: int = 2
+    ORDERS_PREWARM_LIMIT: int = 50
+    ORDERS_PREWARM_CONCURRENCY: int = 4
+    ORDERS_PREWARM_TIMEOUT: float = 30.0
+    # Cache page k+1 in the background after serving page k
+    ORDERS_PREFETCH: bool = False
+    PREFETCH_RATE: float = 5.0
+    PREFETCH_BURST: int = 10
+    PREFETCH_MAX_POOL_USAGE: float = 0.5
+    PREFETCH_BACKOFF: float = 5.0
+    # Admission control per route class (list, export, write): requests
+    # running at once, requests queued beyond that, and the longest a request
+    # may queue before it gets a 503
+    ADMISSION_CONTROL: bool = True
+    ADMISSION_LIST_CONCURRENCY: int = 24
+    ADMISSION_LIST_QUEUE: int = 100
+    ADMISSION_LIST_MAX_WAIT: float = 2.0
+    ADMISSION_EXPORT_CONCURRENCY: int = 2
+    ADMISSION_EXPORT_QUEUE: int = 4
+    ADMISSION_EXPORT_MAX_WAIT: float = 10.0
+    ADMISSION_WRITE_CONCURRENCY: int = 8
+    ADMISSION_WRITE_QUEUE: int = 50
+    ADMISSION_WRITE_MAX_WAIT: float = 5.0
+    ADMISSION_POLL_INTERVAL: float = 0.05
+    # /health/ready: the API serves without Redis (uncached), so by default a
+    # Redis outage is reported but doesn't make the worker unready
+    READY_REQUIRE_REDIS: bool = False
+    HEALTH_CHECK_TIMEOUT: float = 1.0
+    # Statements slower than SLOW_QUERY_THRESHOLD seconds (0 disables) are
+    # kept in a per-worker ring buffer served at /api/admin/slow-queries; a
+    # SLOW_QUERY_EXPLAIN_SAMPLE fraction also get EXPLAIN (ANALYZE, BUFFERS)
+    SLOW_QUERY_THRESHOLD: float = 0.2
+    SLOW_QUERY_LOG_SIZE: int = 200
+    SLOW_QUERY_EXPLAIN_SAMPLE: float = 0.1
+    SLOW_QUERY_EXPLAIN_TIMEOUT: float = 10.0
+    SINGLEFLIGHT_LOCK_TTL: float = 5.0
+    SINGLEFLIGHT_POLL_INTERVAL: float = 0.025
+    # Per-worker tier in front of Redis for orders list pages and generations
+    LOCAL_CACHE_MAX_ENTRIES: int = 1_000
+    LOCAL_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    LOCAL_CACHE_TTL: float = 5.0
+    CATALOG_CACHE_SIZE: int = 20_000
+    CATALOG_CACHE_TTL: int = 60
     ENV: str = "dev"
 
     class Config:
@@ -0,0 +1,202 @@
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Default buckets stop at 10s and start at 5ms; cache and pool waits live
+# well below that.
+FAST_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route (endpoint name)",
+    ["method", "route", "status"],
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "Statement execution time by logical query name",
+    ["engine", "query"],
+)
+
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection, including connects",
+    ["engine"],
+    buckets=FAST_BUCKETS,
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool",
+    ["engine"],
+)
+
+DB_REPLICA_LAG_SECONDS = Gauge(
+    "db_replica_lag_seconds",
+    "Replay lag of the read replica at the last health check",
+)
+
+DB_REPLICA_HEALTHY = Gauge(
+    "db_replica_healthy",
+    "1 while reads are routed to the replica, 0 while they fall back to the primary",
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result (hit, miss, error)",
+    ["cache", "result"],
+)
+
+LOCAL_CACHE_REQUESTS = Counter(
+    "local_cache_requests_total",
+    "Local tier lookups by kind (generation, page) and result (hit, miss)",
+    ["kind", "result"],
+)
+
+CACHE_EVICTIONS = Counter(
+    "cache_evictions_total",
+    "Entries dropped by an in-process cache to stay within its size limits",
+    ["cache"],
+)
+
+CACHE_SIZE_BYTES = Gauge(
+    "cache_size_bytes",
+    "Bytes held by an in-process cache",
+    ["cache"],
+)
+
+CACHE_SECONDS = Histogram(
+    "cache_operation_duration_seconds",
+    "Cache round-trip latency by operation",
+    ["cache", "op"],
+    buckets=FAST_BUCKETS,
+)
+
+SINGLEFLIGHT_REQUESTS = Counter(
+    "singleflight_requests_total",
+    "Cache load outcomes: leader computed a miss, local (same worker) or remote "
+    "joined another computation, fallback computed after waiting, refresh "
+    "recomputed a stale entry",
+    ["result"],
+)
+
+PREFETCH_REQUESTS = Counter(
+    "prefetch_requests_total",
+    "Background prefetches: started, skipped (duplicate, rate_limited, "
+    "pool_busy) or failed",
+    ["name", "result"],
+)
+
+ADMISSION_REQUESTS = Counter(
+    "admission_requests_total",
+    "Admission decisions by route class: admitted, or rejected (queue_full, "
+    "deadline when the expected wait is already too long, timeout)",
+    ["route_class", "result"],
+)
+
+ADMISSION_WAIT_SECONDS = Histogram(
+    "admission_wait_seconds",
+    "Time admitted requests spent queued",
+    ["route_class"],
+    buckets=FAST_BUCKETS,
+)
+
+ADMISSION_ACTIVE = Gauge(
+    "admission_active_requests",
+    "Requests admitted and running",
+    ["route_class"],
+)
+
+ADMISSION_QUEUED = Gauge(
+    "admission_queued_requests",
+    "Requests waiting for admission",
+    ["route_class"],
+)
+
+ENCODE_SECONDS = Histogram(
+    "response_encode_duration_seconds",
+    "Time spent serializing response bodies",
+    ["name"],
+    buckets=FAST_BUCKETS,
+)
+
+
+def query_name(name: str) -> dict:
+    """execution_options labelling a statement for DB_QUERY_SECONDS."""
+    return {"query_name": name}
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that times how long checkouts wait.
+
+    The pool "checkout" event only fires once a connection has been handed
+    over, so the wait itself has to be measured around _do_get.
+    """
+
+    engine_name = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.labels(self.engine_name).observe(time.perf_counter() - start)
+
+
+def instrument_engine(engine, name: str = "primary"):
+    sync_engine = engine.sync_engine
+    pool = sync_engine.pool
+
+    if isinstance(pool, InstrumentedQueuePool):
+        pool.engine_name = name
+        DB_POOL_CHECKED_OUT.labels(name).set_function(lambda: sync_engine.pool.checkedout())
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_start
+        DB_QUERY_SECONDS.labels(name, context.execution_options.get("query_name", "other")).observe(elapsed)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request latency per route.
+
+    Routes are labelled by endpoint name ("list_orders"), never by the raw
+    URL, to keep label cardinality bounded. Unlike the route path, the name
+    does not depend on how the router prefix was applied.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"],
+                getattr(route, "name", None) or "unmatched",
+                str(status),
+            ).observe(time.perf_counter() - start)
+
+
+def render_metrics():
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,64 @@
+from datetime import date, datetime, timezone
+
+# orders and order_items are range partitioned by created_at month (an item
+# carries its order's created_at, enforced by the composite foreign key), one
+# partition per table per month, named <table>_yYYYYmMM. There is no default
+# partition: months are created ahead of time by manage_partitions.py, which
+# keeps old months detachable concurrently.
+#
+# Listed parent first; detaching walks the list backwards.
+PARTITIONED_TABLES = ["orders", "order_items"]
+
+# months created past the current one
+PARTITION_MONTHS_AHEAD = 3
+
+
+def month_start(value: date | datetime) -> date:
+    if isinstance(value, datetime):
+        value = value.astimezone(timezone.utc)
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def months(first: date, last: date):
+    """Every month from first to last, inclusive."""
+    month = month_start(first)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def current_month() -> date:
+    return month_start(datetime.now(timezone.utc))
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def create_partition_sql(table: str, month: date) -> str:
+    # bounds are pinned to UTC, not to the session time zone
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+        f"TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+    )
+
+
+# partitions of a table with their month (from the lower bound), oldest first
+LIST_PARTITIONS_SQL = """
+    SELECT
+        c.relname,
+        (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'FROM \\(''([^'']+)''\\)'))[1]::timestamptz AS lower_bound,
+        c.reltuples::bigint
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = CAST(%s AS regclass)
+    ORDER BY 2
+"""
+
+IS_PARTITIONED_SQL = "SELECT relkind = 'p' FROM pg_class WHERE oid = CAST(%s AS regclass)"
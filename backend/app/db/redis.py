@@ -1,9 +1,162 @@
-import redis
-import os
-
-redis_client = redis.Redis(
-    host=os.getenv("REDIS_HOST", "redis"),
-    port=6379,
-    db=0,
-    decode_responses=True
-)
+import asyncio
+import logging
+import time
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.metrics import CACHE_REQUESTS, CACHE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# delete the lock only if it still holds our token, so a holder that overran
+# its TTL cannot release someone else's lock
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisCache:
+    """Async cache client that fails open.
+
+    Any Redis error or timeout is treated as a miss (or a dropped write) so the
+    caller falls through to the database. After a failure Redis is skipped for
+    REDIS_RETRY_AFTER seconds instead of paying the timeout on every request.
+
+    Values come back as raw bytes (no decode_responses), so cached JSON bodies
+    can be returned to the client untouched.
+    """
+
+    def __init__(self):
+        self.client: aioredis.Redis | None = None
+        self._down_until = 0.0
+
+    async def open(self):
+        pool = aioredis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_TIMEOUT,
+            socket_timeout=settings.REDIS_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_TIMEOUT,
+            decode_responses=False,
+        )
+        self.client = aioredis.Redis(connection_pool=pool)
+
+    async def close(self):
+        if self.client is None:
+            return
+        client, self.client = self.client, None
+        await client.connection_pool.disconnect()
+
+    async def _call(self, op: str, fn):
+        if self.client is None or time.monotonic() < self._down_until:
+            return None
+
+        start = time.perf_counter()
+        try:
+            return await fn(self.client)
+        except (RedisError, OSError) as e:
+            self._down_until = time.monotonic() + settings.REDIS_RETRY_AFTER
+            CACHE_REQUESTS.labels("redis", "error").inc()
+            logger.warning("redis %s failed, serving without cache: %s", op, e)
+            return None
+        finally:
+            CACHE_SECONDS.labels("redis", op).observe(time.perf_counter() - start)
+
+    async def ping(self) -> bool:
+        return bool(await self._call("ping", lambda r: r.ping()))
+
+    async def get(self, key: str):
+        value = await self._call("get", lambda r: r.get(key))
+        CACHE_REQUESTS.labels("redis", "miss" if value is None else "hit").inc()
+        return value
+
+    async def mget(self, keys: list[str]):
+        return await self._call("mget", lambda r: r.mget(keys))
+
+    async def setex(self, key: str, ttl: int, value):
+        return await self._call("setex", lambda r: r.setex(key, ttl, value))
+
+    async def delete(self, keys: list[str]):
+        return await self._call("delete", lambda r: r.delete(*keys))
+
+    async def setnx_many(self, mapping: dict, ttl: int | None = None):
+        def pipeline(r):
+            pipe = r.pipeline(transaction=False)
+            for key, value in mapping.items():
+                pipe.set(key, value, nx=True, ex=ttl)
+            return pipe.execute()
+
+        return await self._call("setnx", pipeline)
+
+    async def setex_many(self, mapping: dict, ttl: int):
+        def pipeline(r):
+            pipe = r.pipeline(transaction=False)
+            for key, value in mapping.items():
+                pipe.setex(key, ttl, value)
+            return pipe.execute()
+
+        return await self._call("setex", pipeline)
+
+    async def incr_many(self, keys: list[str]):
+        def pipeline(r):
+            pipe = r.pipeline(transaction=False)
+            for key in keys:
+                pipe.incr(key)
+            return pipe.execute()
+
+        return await self._call("incr", pipeline)
+
+    async def publish(self, channel: str, message: bytes):
+        return await self._call("publish", lambda r: r.publish(channel, message))
+
+    async def listen(self, channel: str, handler, on_reset):
+        """Call handler(data) for every message on channel until cancelled.
+
+        Uses a connection of its own: the subscription blocks on reads
+        indefinitely, which would hold a pooled connection and trip
+        REDIS_TIMEOUT. on_reset() runs whenever the subscription is
+        (re)established or lost, since messages in between are missed.
+        """
+        while True:
+            client = aioredis.Redis.from_url(
+                settings.REDIS_URL,
+                socket_connect_timeout=settings.REDIS_TIMEOUT,
+                decode_responses=False,
+            )
+            try:
+                async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(channel)
+                    on_reset()
+                    async for message in pubsub.listen():
+                        handler(message["data"])
+            except (RedisError, OSError) as e:
+                logger.warning("redis subscription to %s lost, retrying: %s", channel, e)
+            finally:
+                await client.aclose()
+
+            on_reset()
+            await asyncio.sleep(settings.REDIS_RETRY_AFTER)
+
+    async def acquire_lock(self, key: str, token: str, ttl_ms: int) -> bool | None:
+        """True if taken, False if held elsewhere, None if Redis is unavailable."""
+
+        async def take(r):
+            return bool(await r.set(key, token, nx=True, px=ttl_ms))
+
+        return await self._call("lock", take)
+
+    async def release_lock(self, key: str, token: str):
+        return await self._call("unlock", lambda r: r.eval(RELEASE_LOCK_SCRIPT, 1, key, token))
+
+
+cache = RedisCache()
+
+
+# Dependency for FastAPI routes
+def get_cache() -> RedisCache:
+    return cache
@@ -0,0 +1,22 @@
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from app.db.redis import cache
+from app.utils.orders_cache import bump_orders_generation
+
+# shared by the command-line scripts next to app/ (seed.py, seed_copy.py,
+# manage_partitions.py, check_read_model.py, bench_checkout.py), which talk to
+# the database with psycopg and run outside the app's lifespan
+
+
+def psycopg_dsn() -> str:
+    """DATABASE_URL without its SQLAlchemy driver, for psycopg.connect()."""
+    url = make_url(settings.DATABASE_URL).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+async def bump_cache(statuses=None):
+    """bump_orders_generation() on a connection opened for the call."""
+    await cache.open()
+    await bump_orders_generation(cache, statuses)
+    await cache.close()
@@ -1,12 +1,46 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.core.config import settings
-
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,
-    future=True
+from app.core.metrics import (
+    DB_REPLICA_HEALTHY,
+    DB_REPLICA_LAG_SECONDS,
+    InstrumentedQueuePool,
+    instrument_engine,
+    query_name,
 )
+from app.utils.slow_queries import slow_query_log
+
+logger = logging.getLogger(__name__)
+
+
+def _create_engine(url: str, name: str):
+    engine = create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    instrument_engine(engine, name)
+    slow_query_log.instrument(engine, name)
+    return engine
+
+
+engine = _create_engine(settings.DATABASE_URL, "primary")
+read_engine = _create_engine(settings.READ_DATABASE_URL, "replica") if settings.READ_DATABASE_URL else None
 
 def get_engine():
     return engine
@@ -18,10 +52,175 @@ SessionLocal = sessionmaker(
     class_=AsyncSession,
 )
 
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine,
+    class_=AsyncSession,
+)
+
+# 0 when not in recovery (a plain second server) or when everything received
+# has been replayed, so an idle primary doesn't read as a lagging replica
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class ReplicaMonitor:
+    """Decides whether reads may go to the replica.
+
+    A background task (start() and stop(), run by the app's lifespan) checks
+    the replica every READ_REPLICA_CHECK_INTERVAL seconds and requests route
+    on the last result. The check connects on its own, outside the replica
+    pool: a saturated pool can't fail it, and no request ever waits on it.
+    An unreachable replica, or one lagging more than READ_REPLICA_MAX_LAG
+    seconds, sends reads back to the primary until a later check passes;
+    so does a monitor that isn't running (scripts).
+    """
+
+    def __init__(self, url: str | None):
+        self.engine = create_async_engine(url, poolclass=NullPool) if url else None
+        self.healthy = False
+        self._task: asyncio.Task | None = None
+
+    async def _lag(self) -> float:
+        async with self.engine.connect() as conn:
+            return float((await conn.execute(text(REPLICA_LAG_SQL))).scalar())
+
+    async def check(self):
+        try:
+            lag = await asyncio.wait_for(self._lag(), settings.READ_REPLICA_CHECK_TIMEOUT)
+        except Exception as e:
+            # runs unattended: anything going wrong counts as unavailable
+            if self.healthy:
+                logger.warning("read replica unavailable, reading from primary: %s", e)
+            self.healthy = False
+        else:
+            DB_REPLICA_LAG_SECONDS.set(lag)
+            if self.healthy and lag > settings.READ_REPLICA_MAX_LAG:
+                logger.warning("read replica %.1fs behind, reading from primary", lag)
+            self.healthy = lag <= settings.READ_REPLICA_MAX_LAG
+        finally:
+            DB_REPLICA_HEALTHY.set(int(self.healthy))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.READ_REPLICA_CHECK_INTERVAL)
+            await self.check()
+
+    async def start(self):
+        """Check once, then keep checking in the background."""
+        if self.engine is None:
+            return
+        await self.check()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.engine is not None:
+            await self.engine.dispose()
+
+    def usable(self) -> bool:
+        return self.engine is not None and self.healthy
+
+
+replica = ReplicaMonitor(settings.READ_DATABASE_URL)
+
+
+def _read_pool():
+    return (read_engine if replica.usable() else engine).sync_engine.pool
+
+
+def read_pool_usage() -> float:
+    """Checked-out share of the pool read_session() currently draws from;
+    above 1 once overflow connections are in use."""
+    pool = _read_pool()
+    return pool.checkedout() / pool.size()
+
+
+def pool_saturated(read: bool = False) -> bool:
+    """Whether every connection, overflow included, is checked out of the
+    primary pool (or the one read_session() draws from), so that a checkout
+    now would wait."""
+    pool = _read_pool() if read else engine.sync_engine.pool
+    return pool.checkedout() >= settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+
+
+# Set by admission control for route classes mostly served from cache: they
+# are admitted whatever the pool, and only a request that needs a connection
+# waits for a free one, until this (monotonic) deadline. Tasks started by the
+# request inherit it; those outliving it (stale refreshes, prefetches) set it
+# back to None.
+pool_deadline: ContextVar[float | None] = ContextVar("pool_deadline", default=None)
+
+
+class PoolBusy(Exception):
+    """The pool stayed saturated past the request's pool_deadline."""
+
+
+async def wait_for_pool(read: bool = False):
+    deadline = pool_deadline.get()
+    if deadline is None:
+        return
+
+    while pool_saturated(read):
+        if time.monotonic() >= deadline:
+            raise PoolBusy()
+        await asyncio.sleep(settings.ADMISSION_POLL_INTERVAL)
+
+
+async def database_ready() -> bool:
+    """Whether the primary answers within HEALTH_CHECK_TIMEOUT. A saturated
+    pool counts as not ready without queueing for a connection."""
+    if pool_saturated():
+        return False
+
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"), execution_options=query_name("health"))
+
+    try:
+        await asyncio.wait_for(ping(), settings.HEALTH_CHECK_TIMEOUT)
+    except (SQLAlchemyError, OSError, asyncio.TimeoutError) as e:
+        logger.warning("database not ready: %s", e)
+        return False
+    return True
+
 # Dependency for FastAPI routes
 async def get_db():
+    await wait_for_pool()
     async with SessionLocal() as session:
         try:
             yield session
         finally:
             await session.close()
+
+
+# Session on the primary, for reads that must see the latest writes
+@asynccontextmanager
+async def primary_session():
+    await wait_for_pool()
+    async with SessionLocal() as session:
+        yield session
+
+
+# Read-only session: the replica while it is healthy and caught up, the
+# primary otherwise. Also used outside requests (background refreshes).
+@asynccontextmanager
+async def read_session():
+    await wait_for_pool(read=True)
+    session_factory = ReadSessionLocal if replica.usable() else SessionLocal
+    async with session_factory() as session:
+        yield session
+
+
+# Dependency for read-only routes
+async def get_read_db():
+    async with read_session() as session:
+        yield session
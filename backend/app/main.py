@@ -1,10 +1,38 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.admission import AdmissionMiddleware
 from app.core.config import settings
-from app.routers import users, orders
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.db.redis import cache
+from app.db.session import database_ready, pool_saturated, replica
+from app.routers import admin, users, orders, products, search
+from app.utils.cache_json import ORJSONResponse
+from app.utils.local_cache import listen_for_invalidations
+from app.utils.prefetch import prefetcher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await cache.open()
+    await replica.start()
+    invalidations = asyncio.create_task(listen_for_invalidations(cache))
+    # the worker starts accepting requests once the hot pages are cached
+    await orders.prewarm_orders(cache)
+    yield
+    prefetcher.cancel()
+    invalidations.cancel()
+    await replica.stop()
+    await cache.close()
+
+
+app = FastAPI(title="Admin Backend API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
-app = FastAPI(title="Admin Backend API")
+# inside CORS, so rejections still carry its headers
+app.add_middleware(AdmissionMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,10 +42,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
 app.include_router(orders.router, prefix="/api/orders", tags=["Orders"])
-# app.include_router(products.router, prefix="/api/products", tags=["Products"])
+app.include_router(products.router, prefix="/api/products", tags=["Products"])
+app.include_router(search.router, prefix="/api/search", tags=["Search"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 
+# Liveness: the process is up and serving. /health is kept for existing
+# probes.
 @app.get("/health")
+@app.get("/health/live")
 def health():
     return {"ok": True}
+
+
+# Readiness: worth sending traffic to. The worker only starts serving once
+# the startup prewarm is done, so this is about the database pool and Redis.
+@app.get("/health/ready")
+async def ready():
+    checks = {
+        "pool": not pool_saturated(),
+        "database": await database_ready(),
+        "redis": await cache.ping(),
+    }
+    ok = checks["pool"] and checks["database"] and (checks["redis"] or not settings.READY_REQUIRE_REDIS)
+    return ORJSONResponse({"ok": ok, "checks": checks}, status_code=200 if ok else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -4,6 +4,7 @@ from .product import Product
 from .order import Order
 from .order_item import OrderItem
 from .cart_item import CartItem
+from .checkout_request import CheckoutRequest
 
 __all__ = [
     "Base",
@@ -12,4 +13,5 @@ __all__ = [
     "Order",
     "OrderItem",
     "CartItem",
+    "CheckoutRequest",
 ]
@@ -0,0 +1,11 @@
+from sqlalchemy import ForeignKey, String, DateTime, func, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from .base import Base
+
+class CheckoutRequest(Base):
+    __tablename__ = "checkout_requests"
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    idempotency_key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    order_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    order_created_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
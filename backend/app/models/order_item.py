@@ -1,11 +1,17 @@
-from sqlalchemy import ForeignKey, String, DateTime, func, Numeric, Integer
+from sqlalchemy import ForeignKey, ForeignKeyConstraint, String, DateTime, func, Numeric, Integer
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .base import Base
 
 class OrderItem(Base):
     __tablename__ = "order_items"
-    id: Mapped[int] = mapped_column(primary_key=True)
-    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id"), index=True)
+    # partitioned like orders; created_at is always the order's
+    __table_args__ = (
+        ForeignKeyConstraint(["order_id", "created_at"], ["orders.id", "orders.created_at"]),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    order_id: Mapped[int] = mapped_column(Integer, index=True)
     product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), index=True)
     qty: Mapped[int] = mapped_column(Integer, default=1)
     unit_price: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), primary_key=True)
@@ -0,0 +1,41 @@
+import os
+
+from fastapi import APIRouter, Query, Response
+
+from app.utils.slow_queries import slow_query_log
+
+router = APIRouter()
+
+# The slow query log is per worker: each response names the worker (pid) it
+# came from, and a request may land on any of them.
+
+
+@router.get("/slow-queries")
+def list_slow_queries(
+    # logical query name, e.g. orders.page
+    query: str | None = None,
+    # statement or plan fingerprint
+    fingerprint: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Recent slow statements, newest first, with their plans when captured."""
+    return {
+        "worker": os.getpid(),
+        "data": slow_query_log.recent(query, fingerprint, limit),
+    }
+
+
+@router.get("/slow-queries/groups")
+def slow_query_groups():
+    """Slow statements grouped by query name, statement fingerprint and plan
+    fingerprint, so a query that switched plans shows up as two groups."""
+    return {
+        "worker": os.getpid(),
+        "data": slow_query_log.groups(),
+    }
+
+
+@router.delete("/slow-queries", status_code=204)
+def clear_slow_queries():
+    slow_query_log.clear()
+    return Response(status_code=204)
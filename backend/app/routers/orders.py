@@ -1,10 +1,38 @@
-from fastapi import APIRouter, Depends, Query
+import asyncio
+import csv
+import io
+import logging
+import time
+import zlib
+from datetime import datetime, timezone
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 
-from app.db.session import get_db
-from app.db.redis import redis_client
-from app.utils.cache_json import dumps, loads
+from app.core.config import settings
+from app.core.metrics import ENCODE_SECONDS, query_name
+from app.db.session import SessionLocal, get_db, get_read_db, primary_session, read_session
+from app.db.redis import RedisCache, get_cache
+from app.utils.cache_json import cached_json_response, dumps
+from app.utils.catalog import catalog
+from app.utils.counting import COUNT_STRATEGIES, count_rows
+from app.utils.cursor import InvalidCursor, decode_cursor, encode_cursor
+from app.utils.local_cache import local_cache
+from app.utils.orders_cache import (
+    bump_order_details,
+    bump_orders_generation,
+    order_detail_key,
+    orders_generation,
+    orders_read_session,
+)
+from app.utils.prefetch import prefetcher
+from app.utils import singleflight
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -16,115 +44,839 @@ SORT_COLUMNS = {
     "customer_name": "u.name",
 }
 
-@router.get("/")
-async def list_orders(
-    search: str | None = Query(None),
-    status: str | None = Query(None),
-    sort: str = Query("created_at"),
-    order: str = Query("desc"),
-    limit: int = 50,
-    offset: int = 0,
-    db: AsyncSession = Depends(get_db),
-):
-    sort_column = SORT_COLUMNS.get(sort, "o.created_at")
-    sort_direction = "ASC" if order == "asc" else "DESC"
+# what each key's values are, to check the key a cursor carries
+SORT_KEY_TYPES = {
+    "created_at": datetime,
+    "order_id": int,
+    "status": str,
+    "total": int,
+    "customer_name": str,
+}
 
-    cache_key = (
-        f"orders:list:"
-        f"search={search}|status={status}|"
-        f"sort={sort}|order={order}|"
-        f"limit={limit}|offset={offset}"
-    )
+# the same keys on the order_list_rows read model (ORDERS_READ_MODEL), which
+# has an index per key
+READ_MODEL_SORT_COLUMNS = {
+    "created_at": "o.created_at",
+    "order_id": "o.order_id",
+    "status": "o.status",
+    "total": "o.total",
+    "customer_name": "o.user_name",
+}
 
-    cached = redis_client.get(cache_key)
-    if cached:
-        return loads(cached)
+# Items are joined on (order_id, created_at): an item carries its order's
+# created_at, and with both tables partitioned by created_at month the join
+# then reads a single order_items partition per order.
 
-    is_numeric_search = search.isdigit() if search else False
+# one row per order item, grouped back into orders by the export
+ORDER_ROWS_SQL = """
+    SELECT
+        o.id AS order_id,
+        o.status,
+        o.total,
+        o.created_at,
+        u.id AS user_id,
+        u.name AS user_name,
+        u.email AS user_email,
+        oi.id AS order_item_id,
+        oi.qty,
+        oi.unit_price,
+        p.id AS product_id,
+        p.title AS product_title,
+        p.sku AS product_sku
+    FROM orders o
+    JOIN users u ON o.user_id = u.id
+    JOIN order_items oi ON oi.order_id = o.id AND oi.created_at = o.created_at
+    JOIN products p ON oi.product_id = p.id
+"""
 
-    # --------------------
-    # Count query
-    # --------------------
-    count_sql = """
-        SELECT COUNT(DISTINCT o.id)
-        FROM orders o
-        JOIN users u ON o.user_id = u.id
-        WHERE 1=1
-    """
+UNKNOWN_PRODUCT = {"title": None, "sku": None}
 
-    count_params = {}
+# counts list_orders can return alongside a page (facets=status): orders per
+# value under every filter but that facet's own
+FACETS = {"status"}
 
-    if search:
-        if is_numeric_search:
-            count_sql += " AND (o.id = :order_id OR u.name ILIKE :search)"
-            count_params["order_id"] = int(search)
-            count_params["search"] = f"%{search}%"
-        else:
-            count_sql += " AND u.name ILIKE :search"
-            count_params["search"] = f"%{search}%"
+# status -> statuses it may move to; completed and cancelled are final
+ORDER_STATUS_TRANSITIONS = {
+    "pending": ("processing", "cancelled"),
+    "processing": ("shipped", "cancelled"),
+    "shipped": ("completed",),
+    "completed": (),
+    "cancelled": (),
+}
 
-    if status:
-        count_sql += " AND o.status = :status"
-        count_params["status"] = status
+# the transitions as a VALUES list, so the check runs in the UPDATE itself
+# against the status it has locked
+TRANSITIONS_SQL = ", ".join(
+    f"('{current}', '{new}')"
+    for current, allowed in ORDER_STATUS_TRANSITIONS.items()
+    for new in allowed
+)
 
-    total = (await db.execute(text(count_sql), count_params)).scalar() or 0
+MAX_BATCH_ORDERS = 500
 
-    # --------------------
-    # ID pagination query
-    # --------------------
-    order_id_sql = f"""
-        SELECT o.id
-        FROM orders o
-        JOIN users u ON o.user_id = u.id
-        WHERE 1=1
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_CSV_COLUMNS = [
+    "order_id",
+    "status",
+    "total",
+    "created_at",
+    "user_id",
+    "user_name",
+    "user_email",
+    "order_item_id",
+    "product_id",
+    "product_sku",
+    "product_title",
+    "qty",
+    "unit_price",
+]
+
+
+def _order_dict(r):
+    return {
+        "order_id": r.order_id,
+        "status": r.status,
+        "total": float(r.total),
+        "created_at": r.created_at.isoformat() if r.created_at else None,
+        "user": {
+            "user_id": r.user_id,
+            "name": r.user_name,
+            "email": r.user_email,
+        },
+        "items": [],
+    }
+
+
+def _item_dict(r, title, sku):
+    return {
+        "order_item_id": r.order_item_id,
+        "qty": r.qty,
+        "unit_price": float(r.unit_price),
+        "product": {
+            "product_id": r.product_id,
+            "title": title,
+            "sku": sku,
+        },
+    }
+
+
+# The SQL page builders write the JSON text themselves, byte for byte what
+# dumps() makes of _order_dict()/_item_dict(), so a page has the same bytes
+# and ETag whichever path built it (json_build_object spaces its output and
+# formats timestamps its own way). Arguments are SQL expressions, bracketed
+# here since || binds no tighter than ->>.
+
+
+def _json_str(value: str) -> str:
+    return f"to_json(({value}))::text"
+
+
+def _json_price(value: str) -> str:
+    # totals and prices are integers, which float() turns into 354.0
+    return f"({value})::text || '.0'"
+
+
+def _json_timestamp(value: str) -> str:
+    # datetime.isoformat() in UTC: microseconds only when there are any
+    return f"""(
+        '"' || to_char(({value}) AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS')
+        || CASE WHEN date_trunc('second', ({value})) = ({value}) THEN ''
+                ELSE to_char(({value}) AT TIME ZONE 'UTC', '.US') END
+        || '+00:00"'
+    )"""
+
+
+def _item_json(order_item_id, qty, unit_price, product_id, title, sku) -> str:
+    return f"""
+        '{{"order_item_id":' || ({order_item_id})
+        || ',"qty":' || ({qty})
+        || ',"unit_price":' || {_json_price(unit_price)}
+        || ',"product":{{"product_id":' || ({product_id})
+        || ',"title":' || {_json_str(title)}
+        || ',"sku":' || {_json_str(sku)}
+        || '}}}}'
     """
 
+
+def _order_json(order_id, status, total, created_at, user_id, user_name, user_email, items) -> str:
+    return f"""
+        '{{"order_id":' || ({order_id})
+        || ',"status":' || {_json_str(status)}
+        || ',"total":' || {_json_price(total)}
+        || ',"created_at":' || {_json_timestamp(created_at)}
+        || ',"user":{{"user_id":' || ({user_id})
+        || ',"name":' || {_json_str(user_name)}
+        || ',"email":' || {_json_str(user_email)}
+        || '}},"items":' || {items}
+        || '}}'
+    """
+
+
+def _created_at(value: datetime | None) -> datetime | None:
+    # naive datetimes are taken as UTC, the partition bounds' time zone
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _order_filters(
+    search: str | None,
+    status: str | None,
+    id_column: str = "o.id",
+    name_column: str = "u.name",
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    created_columns: tuple[str, ...] = ("o.created_at",),
+):
+    sql = ""
     params = {}
 
     if search:
-        if is_numeric_search:
-            order_id_sql += " AND (o.id = :order_id OR u.name ILIKE :search)"
+        if search.isdigit():
+            sql += f" AND ({id_column} = :order_id OR {name_column} ILIKE :search)"
             params["order_id"] = int(search)
             params["search"] = f"%{search}%"
         else:
-            order_id_sql += " AND u.name ILIKE :search"
+            sql += f" AND {name_column} ILIKE :search"
             params["search"] = f"%{search}%"
 
     if status:
-        order_id_sql += " AND o.status = :status"
+        sql += " AND o.status = :status"
         params["status"] = status
 
-    order_id_sql += f"""
-        ORDER BY {sort_column} {sort_direction}, o.id DESC
-        LIMIT :limit OFFSET :offset
+    # a half-open range on the partition key: only the months it overlaps
+    # are scanned. The planner doesn't carry a range across a join, so a
+    # query joining order_items passes oi.created_at as well.
+    for column in created_columns:
+        if created_from:
+            sql += f" AND {column} >= :created_from"
+            params["created_from"] = created_from
+
+        if created_to:
+            sql += f" AND {column} < :created_to"
+            params["created_to"] = created_to
+
+    return sql, params
+
+
+def _list_source(
+    read_model: bool,
+    search: str | None,
+    status: str | None,
+    created_from: datetime | None,
+    created_to: datetime | None,
+):
+    """(from_sql, params, id column) of the orders list's filtered rows."""
+    if read_model:
+        filter_sql, params = _order_filters(search, status, "o.order_id", "o.user_name", created_from, created_to)
+        from_sql = f"""
+            FROM order_list_rows o
+            WHERE 1=1 {filter_sql}
+        """
+        return from_sql, params, "o.order_id"
+
+    filter_sql, params = _order_filters(search, status, created_from=created_from, created_to=created_to)
+    from_sql = f"""
+        FROM orders o
+        JOIN users u ON o.user_id = u.id
+        WHERE 1=1 {filter_sql}
     """
+    return from_sql, params, "o.id"
 
-    params["limit"] = limit
-    params["offset"] = offset
 
-    order_ids = [
-        r[0]
-        for r in (await db.execute(text(order_id_sql), params)).fetchall()
-    ]
+def _filters_key(search, status, created_from, created_to) -> str:
+    return (
+        f"search={search}|status={status}|"
+        f"from={created_from and created_from.isoformat()}|to={created_to and created_to.isoformat()}"
+    )
+
+
+def _count_cache_key(generation: str, search, status, created_from, created_to) -> str:
+    return f"orders:count:g={generation}|{_filters_key(search, status, created_from, created_to)}"
+
+
+async def _status_facets(
+    db: AsyncSession,
+    cache: RedisCache,
+    *,
+    search: str | None,
+    created_from: datetime | None,
+    created_to: datetime | None,
+) -> dict[str, int]:
+    """Orders per status under the other filters, every status included.
+
+    The counts are the totals list_orders caches for count=cached with a
+    status filter, under the same keys: those already cached are reused and
+    the rest come from one GROUP BY and are cached for the list in turn.
+    """
+    from_sql, params, _ = _list_source(settings.ORDERS_READ_MODEL, search, None, created_from, created_to)
+    counts = dict.fromkeys(ORDER_STATUS_TRANSITIONS, 0)
+
+    keys = {}
+    for status in ORDER_STATUS_TRANSITIONS:
+        generation = await orders_generation(cache, status)
+        if generation is None:
+            keys = None
+            break
+        keys[status] = _count_cache_key(generation, search, status, created_from, created_to)
+
+    cached = await cache.mget(list(keys.values())) if keys else None
+    if cached is None:
+        missing = list(counts)
+    else:
+        missing = [status for status, value in zip(keys, cached) if value is None]
+        counts.update({status: int(value) for status, value in zip(keys, cached) if value is not None})
+        if not missing:
+            return counts
+
+        from_sql += " AND o.status = ANY(:facet_statuses)"
+        params = {**params, "facet_statuses": missing}
+
+    rows = (
+        await db.execute(
+            text(f"SELECT o.status, COUNT(*) AS n {from_sql} GROUP BY o.status"),
+            params,
+            execution_options=query_name("orders.facets"),
+        )
+    ).fetchall()
+    counts.update({r.status: r.n for r in rows})
+
+    if cached is not None:
+        await cache.setex_many({keys[status]: counts[status] for status in missing}, settings.ORDERS_LIST_CACHE_TTL)
+
+    return counts
+
+
+async def _fetch_page_json(db, page_from_sql, params, sort_column, sort_direction, window_count):
+    """Build the whole page in one statement.
+
+    Returns a single row: the page as an encoded JSON array (data), its row
+    count, the window count when requested, and the last row's sort key and id
+    for the next cursor.
+    """
+    items = f"""COALESCE((
+        SELECT '[' || string_agg({
+            _item_json("oi.id", "oi.qty", "oi.unit_price", "p.id", "p.title", "p.sku")
+        }, ',' ORDER BY oi.id) || ']'
+        FROM order_items oi
+        JOIN products p ON oi.product_id = p.id
+        WHERE oi.order_id = page.id AND oi.created_at = page.created_at
+    ), '[]')"""
+    doc = _order_json(
+        "page.id", "page.status", "page.total", "page.created_at",
+        "page.user_id", "page.user_name", "page.user_email", items,
+    )
+    sql = f"""
+        WITH page AS (
+            SELECT
+                o.id,
+                o.status,
+                o.total,
+                o.created_at,
+                u.id AS user_id,
+                u.name AS user_name,
+                u.email AS user_email,
+                {sort_column} AS sort_key,
+                {"COUNT(*) OVER ()" if window_count else "NULL::bigint"} AS full_count
+            {page_from_sql}
+        ),
+        docs AS (
+            SELECT
+                page.*,
+                ROW_NUMBER() OVER (ORDER BY sort_key {sort_direction}, id {sort_direction}) AS rn,
+                {doc} AS doc
+            FROM page
+        )
+        SELECT
+            '[' || COALESCE(string_agg(doc, ',' ORDER BY rn), '') || ']' AS data,
+            COUNT(*) AS page_count,
+            MAX(full_count) AS full_count,
+            (array_agg(sort_key ORDER BY rn DESC))[1] AS last_key,
+            (array_agg(id ORDER BY rn DESC))[1] AS last_id
+        FROM docs
+    """
+
+    return (await db.execute(text(sql), params, execution_options=query_name("orders.page"))).one()
+
+
+async def _fetch_read_model_page(db, page_from_sql, params, sort_column, sort_direction, window_count):
+    """_fetch_page_json over order_list_rows: the rows already hold the
+    customer and the encoded items, so nothing is joined."""
+    # the stored items are JSONB, which orders keys by length and spaces its
+    # text, so they are written out again
+    item = _item_json(
+        "e->>'order_item_id'", "e->>'qty'", "e->>'unit_price'",
+        "e->'product'->>'product_id'", "e->'product'->>'title'", "e->'product'->>'sku'",
+    )
+    items = f"""(
+        SELECT '[' || COALESCE(string_agg({item}, ',' ORDER BY n), '') || ']'
+        FROM jsonb_array_elements(items) WITH ORDINALITY AS item(e, n)
+    )"""
+    doc = _order_json(
+        "order_id", "status", "total", "created_at", "user_id", "user_name", "user_email", items,
+    )
+    sql = f"""
+        WITH page AS (
+            SELECT
+                o.*,
+                {sort_column} AS sort_key,
+                {"COUNT(*) OVER ()" if window_count else "NULL::bigint"} AS full_count
+            {page_from_sql}
+        ),
+        docs AS (
+            SELECT
+                page.*,
+                ROW_NUMBER() OVER (ORDER BY sort_key {sort_direction}, order_id {sort_direction}) AS rn
+            FROM page
+        )
+        SELECT
+            '[' || COALESCE(string_agg({doc}, ',' ORDER BY rn), '') || ']' AS data,
+            COUNT(*) AS page_count,
+            MAX(full_count) AS full_count,
+            (array_agg(sort_key ORDER BY rn DESC))[1] AS last_key,
+            (array_agg(order_id ORDER BY rn DESC))[1] AS last_id
+        FROM docs
+    """
+
+    return (await db.execute(text(sql), params, execution_options=query_name("orders.page"))).one()
+
+
+async def _build_orders_page(
+    db: AsyncSession,
+    cache: RedisCache,
+    *,
+    search: str | None,
+    status: str | None,
+    created_from: datetime | None,
+    created_to: datetime | None,
+    sort: str,
+    order: str,
+    limit: int,
+    offset: int,
+    seek,
+    count: str,
+    count_cache_key: str | None,
+    facets: tuple[str, ...] = (),
+) -> bytes:
+    """Run the count and page queries and return the encoded response body."""
+    read_model = settings.ORDERS_READ_MODEL
+    sort_direction = order.upper()
+    sort_column = (READ_MODEL_SORT_COLUMNS if read_model else SORT_COLUMNS)[sort]
+    from_sql, filter_params, id_column = _list_source(read_model, search, status, created_from, created_to)
+
+    # the o.id tie-breaker follows the sort direction so the ORDER BY matches
+    # the row-value seek and (created_at, id) index scans
+    page_sql = ""
+    page_params = {"limit": limit}
+
+    if seek:
+        comparator = ">" if order == "asc" else "<"
+        if sort == "order_id":
+            page_sql += f" AND {id_column} {comparator} :cursor_id"
+        else:
+            page_sql += f" AND ({sort_column}, {id_column}) {comparator} (:cursor_key, :cursor_id)"
+            page_params["cursor_key"] = seek[0]
+        page_params["cursor_id"] = seek[1]
+
+    page_sql += f"""
+        ORDER BY {sort_column} {sort_direction}, {id_column} {sort_direction}
+        LIMIT :limit
+    """
+
+    if not seek:
+        page_sql += " OFFSET :offset"
+        page_params["offset"] = offset
+
+    # --------------------
+    # Count query
+    # --------------------
+    # the single-statement paths fold an exact count into the page query as a
+    # window aggregate; with a cursor that would only count the remaining rows
+    single_statement = read_model or settings.ORDERS_SQL_JSON
+    window_count = single_statement and count == "exact" and not seek
+
+    count_kwargs = dict(
+        from_sql=from_sql,
+        params=filter_params,
+        table="order_list_rows" if read_model else "orders",
+        filtered=bool(search or status or created_from or created_to),
+        cache_key=count_cache_key,
+        ttl=settings.ORDERS_LIST_CACHE_TTL,
+    )
+
+    # orders -> users is many-to-one, so a plain COUNT(*) needs no DISTINCT
+    if window_count:
+        total, count_strategy = None, "exact"
+    else:
+        total, count_strategy = await count_rows(db, cache, count, **count_kwargs)
+
+    # placed before "pagination", which stays the body's last key
+    page_facets = None
+    if "status" in facets:
+        page_facets = {
+            "status": await _status_facets(
+                db, cache, search=search, created_from=created_from, created_to=created_to
+            )
+        }
+
+    if single_statement:
+        fetch_page = _fetch_read_model_page if read_model else _fetch_page_json
+        page = await fetch_page(
+            db,
+            from_sql + page_sql,
+            {**filter_params, **page_params},
+            sort_column,
+            sort_direction,
+            window_count,
+        )
+
+        if window_count:
+            total = page.full_count or 0
+            if not page.page_count and offset:
+                # ran past the end, no row carried the window count
+                total, _ = await count_rows(db, cache, "exact", **count_kwargs)
+
+        next_cursor = None
+        if page.page_count and page.page_count == limit:
+            next_cursor = encode_cursor(sort, order, page.last_key, page.last_id)
+
+        pagination = {
+            "total": total,
+            "count_strategy": count_strategy,
+            "limit": limit,
+            "offset": None if seek else offset,
+            "count": page.page_count,
+            "next_cursor": next_cursor,
+        }
+
+        # the rows arrive as one encoded JSON array and are spliced in as-is
+        with ENCODE_SECONDS.labels("orders.list").time():
+            body = b'{"data":' + page.data.encode()
+            if page_facets is not None:
+                body += b',"facets":' + orjson.dumps(page_facets)
+            body += b',"pagination":' + orjson.dumps(pagination) + b"}"
+
+        return body
+
+    # --------------------
+    # ID pagination query
+    # --------------------
+    order_id_sql = f"SELECT o.id, o.created_at, {sort_column} AS sort_key {from_sql} {page_sql}"
+
+    page = (
+        await db.execute(
+            text(order_id_sql),
+            {**filter_params, **page_params},
+            execution_options=query_name("orders.ids"),
+        )
+    ).fetchall()
+    order_ids = [r.id for r in page]
+
+    next_cursor = None
+    if page and len(page) == limit:
+        next_cursor = encode_cursor(sort, order, page[-1].sort_key, page[-1].id)
+
+    pagination = {
+        "total": total,
+        "count_strategy": count_strategy,
+        "limit": limit,
+        "offset": None if seek else offset,
+        "count": len(order_ids),
+        "next_cursor": next_cursor,
+    }
 
     if not order_ids:
         response = {
             "data": [],
-            "pagination": {
-                "total": total,
-                "limit": limit,
-                "offset": offset,
-                "count": 0,
-            },
+            **({"facets": page_facets} if page_facets is not None else {}),
+            "pagination": pagination,
         }
-        redis_client.setex(cache_key, 30, dumps(response))
-        return response
+        return dumps(response)
 
     # --------------------
     # Full data query
     # --------------------
+    # product title/SKU come from the in-process catalog instead of a join;
+    # the page's created_at range limits the id lookup to its months
     sql = f"""
-        SELECT 
+        SELECT
+            o.id AS order_id,
+            o.status,
+            o.total,
+            o.created_at,
+            u.id AS user_id,
+            u.name AS user_name,
+            u.email AS user_email,
+            oi.id AS order_item_id,
+            oi.qty,
+            oi.unit_price,
+            oi.product_id
+        FROM orders o
+        JOIN users u ON o.user_id = u.id
+        JOIN order_items oi ON oi.order_id = o.id AND oi.created_at = o.created_at
+        WHERE o.id = ANY(:order_ids)
+          AND o.created_at BETWEEN :first_created AND :last_created
+          AND oi.created_at BETWEEN :first_created AND :last_created
+        ORDER BY {sort_column} {sort_direction}, o.id {sort_direction}, oi.id
+    """
+
+    params = {
+        "order_ids": order_ids,
+        "first_created": min(r.created_at for r in page),
+        "last_created": max(r.created_at for r in page),
+    }
+    rows = (await db.execute(text(sql), params, execution_options=query_name("orders.page"))).fetchall()
+    products = await catalog.get_many(db, {r.product_id for r in rows})
+
+    orders = {}
+
+    for r in rows:
+        if r.order_id not in orders:
+            orders[r.order_id] = _order_dict(r)
+
+        product = products.get(r.product_id, UNKNOWN_PRODUCT)
+        orders[r.order_id]["items"].append(_item_dict(r, product["title"], product["sku"]))
+
+    response = {
+        "data": list(orders.values()),
+        **({"facets": page_facets} if page_facets is not None else {}),
+        "pagination": pagination,
+    }
+
+    # encode once; the same bytes go to Redis and to the client
+    with ENCODE_SECONDS.labels("orders.list").time():
+        return dumps(response)
+
+
+async def load_orders_page(
+    cache: RedisCache,
+    *,
+    search: str | None = None,
+    status: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    sort: str = "created_at",
+    order: str = "desc",
+    limit: int = 50,
+    offset: int = 0,
+    cursor: str | None = None,
+    count: str = "cached",
+    facets: tuple[str, ...] = (),
+) -> tuple[bytes, str]:
+    """Return (encoded page, cache state) for validated list_orders
+    parameters, read through orders_read_session(). Raises InvalidCursor."""
+    # keyset mode: the cursor carries the last row's (sort key, o.id) and
+    # replaces OFFSET with a row-value seek
+    seek = decode_cursor(cursor, sort, order, SORT_KEY_TYPES[sort]) if cursor else None
+
+    # no generation means Redis is unavailable: skip the cache entirely.
+    # Status facets count every status, so a page carrying them is keyed on
+    # the unfiltered lists' generation, which every status change bumps.
+    generation = await orders_generation(cache, status)
+    page_generation = await orders_generation(cache, None) if facets and status else generation
+    cache_key = count_cache_key = None
+    if generation is not None and page_generation is not None:
+        count_cache_key = _count_cache_key(generation, search, status, created_from, created_to)
+        cache_key = (
+            f"orders:list:g={page_generation}|"
+            f"{_filters_key(search, status, created_from, created_to)}|"
+            f"sort={sort}|order={order}|"
+            f"limit={limit}|offset={offset}|cursor={cursor}|count={count}|"
+            f"facets={','.join(facets)}"
+        )
+
+    def build(session: AsyncSession):
+        return _build_orders_page(
+            session,
+            cache,
+            search=search,
+            status=status,
+            created_from=created_from,
+            created_to=created_to,
+            sort=sort,
+            order=order,
+            limit=limit,
+            offset=offset,
+            seek=seek,
+            count=count,
+            count_cache_key=count_cache_key,
+            facets=facets,
+        )
+
+    if not cache_key:
+        async with read_session() as db:
+            return await build(db), "miss"
+
+    # stale pages are served while one task refreshes them, concurrent misses
+    # share one computation
+    return await singleflight.load(
+        cache,
+        cache_key,
+        build,
+        ttl=settings.ORDERS_LIST_CACHE_TTL,
+        stale_ttl=settings.ORDERS_LIST_STALE_TTL,
+        local=local_cache,
+        session=lambda: orders_read_session(cache),
+    )
+
+
+@router.get("/")
+async def list_orders(
+    request: Request,
+    search: str | None = Query(None),
+    status: str | None = Query(None),
+    created_from: datetime | None = Query(None),
+    created_to: datetime | None = Query(None),
+    sort: str = Query("created_at"),
+    order: str = Query("desc"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None),
+    count: str = Query("cached"),
+    facets: str | None = Query(None),
+    cache: RedisCache = Depends(get_cache),
+):
+    if sort not in SORT_COLUMNS:
+        sort = "created_at"
+    order = "asc" if order == "asc" else "desc"
+    if count not in COUNT_STRATEGIES:
+        count = "cached"
+    # the status names a generation key, so only real statuses get that far
+    if status and status not in ORDER_STATUS_TRANSITIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown status: {status}")
+
+    # comma-separated; sorted so equivalent requests share a cache key
+    facet_names = tuple(sorted({f.strip() for f in (facets or "").split(",") if f.strip()}))
+    unknown = set(facet_names) - FACETS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown facets: {', '.join(sorted(unknown))}")
+
+    params = dict(
+        search=search,
+        status=status,
+        created_from=_created_at(created_from),
+        created_to=_created_at(created_to),
+        sort=sort,
+        order=order,
+        limit=limit,
+        offset=offset,
+        cursor=cursor,
+        count=count,
+        facets=facet_names,
+    )
+
+    try:
+        body, cache_state = await load_orders_page(cache, **params)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if settings.ORDERS_PREFETCH:
+        _prefetch_next_page(cache, body, params)
+
+    return cached_json_response(request, body, {"X-Cache": cache_state})
+
+
+# --------------------
+# Prewarming and prefetch
+# --------------------
+def _pagination(body: bytes) -> dict:
+    # "pagination" is the last key of every page body; a JSON string can't
+    # contain the quoted key unescaped, so the last match is the real one
+    return orjson.loads(body[body.rindex(b'"pagination":') + len(b'"pagination":'):-1])
+
+
+def _prefetch_next_page(cache: RedisCache, body: bytes, params: dict):
+    """Cache the page after this one in the background (admins page
+    sequentially), the way list_orders would request it."""
+    pagination = _pagination(body)
+    if pagination["count"] < params["limit"]:
+        return
+
+    if params["cursor"]:
+        if not pagination["next_cursor"]:
+            return
+        next_params = {**params, "cursor": pagination["next_cursor"]}
+    else:
+        offset = params["offset"] + params["limit"]
+        if pagination["total"] is not None and offset >= pagination["total"]:
+            return
+        next_params = {**params, "offset": offset}
+
+    async def load():
+        await load_orders_page(cache, **next_params)
+
+    prefetcher.submit(orjson.dumps(next_params).decode(), load)
+
+
+async def prewarm_orders(cache: RedisCache):
+    """Cache the first ORDERS_PREWARM_PAGES pages of every sort, unfiltered
+    and per status, in the default direction and page size.
+
+    Runs before the worker starts serving, ORDERS_PREWARM_CONCURRENCY loads
+    at a time and for at most ORDERS_PREWARM_TIMEOUT seconds. Workers
+    starting together share each computation through singleflight. Failures
+    are logged and never block startup.
+    """
+    if settings.ORDERS_PREWARM_PAGES <= 0:
+        return
+    if await orders_generation(cache, None) is None:
+        logger.warning("Redis unavailable, skipping orders prewarm")
+        return
+
+    limit = settings.ORDERS_PREWARM_LIMIT
+    queries = [
+        dict(sort=sort, status=status, limit=limit, offset=page * limit)
+        for sort in SORT_COLUMNS
+        for status in [None, *ORDER_STATUS_TRANSITIONS]
+        for page in range(settings.ORDERS_PREWARM_PAGES)
+    ]
+    semaphore = asyncio.Semaphore(settings.ORDERS_PREWARM_CONCURRENCY)
+    started = time.perf_counter()
+
+    async def warm(params):
+        async with semaphore:
+            try:
+                await load_orders_page(cache, **params)
+            except Exception:
+                logger.exception("prewarming orders page %s failed", params)
+
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*(warm(params) for params in queries)),
+            settings.ORDERS_PREWARM_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        logger.warning("orders prewarm stopped after %ss", settings.ORDERS_PREWARM_TIMEOUT)
+    else:
+        logger.info("prewarmed %d orders pages in %.1fs", len(queries), time.perf_counter() - started)
+
+
+# --------------------
+# Bulk operations
+# --------------------
+class OrderIds(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=MAX_BATCH_ORDERS)
+
+
+class StatusChange(BaseModel):
+    order_id: int
+    status: str
+
+
+class StatusChanges(BaseModel):
+    changes: list[StatusChange] = Field(..., min_length=1, max_length=MAX_BATCH_ORDERS)
+
+
+async def _fetch_orders(db: AsyncSession, order_ids: list[int]) -> dict[int, dict]:
+    """Orders by id in one query, shaped like list_orders rows."""
+    # An order looked up by id alone is one primary key probe per monthly
+    # partition. Its items are joined on its created_at too, so looked up
+    # per order they are only searched for in that month's partition. LEFT
+    # JOINs so an order without items is still found.
+    sql = """
+        SELECT
             o.id AS order_id,
             o.status,
             o.total,
@@ -140,51 +892,320 @@ async def list_orders(
             p.sku AS product_sku
         FROM orders o
         JOIN users u ON o.user_id = u.id
-        JOIN order_items oi ON oi.order_id = o.id
-        JOIN products p ON oi.product_id = p.id
+        LEFT JOIN order_items oi ON oi.order_id = o.id AND oi.created_at = o.created_at
+        LEFT JOIN products p ON oi.product_id = p.id
         WHERE o.id = ANY(:order_ids)
-        ORDER BY {sort_column} {sort_direction}, o.id DESC
+        ORDER BY o.id, oi.id
     """
 
-    rows = (await db.execute(text(sql), {"order_ids": order_ids})).fetchall()
+    rows = (
+        await db.execute(text(sql), {"order_ids": order_ids}, execution_options=query_name("orders.by_id"))
+    ).fetchall()
 
     orders = {}
-
     for r in rows:
         if r.order_id not in orders:
-            orders[r.order_id] = {
-                "order_id": r.order_id,
-                "status": r.status,
-                "total": float(r.total),
-                "created_at": r.created_at.isoformat() if r.created_at else None,
-                "user": {
-                    "user_id": r.user_id,
-                    "name": r.user_name,
-                    "email": r.user_email,
-                },
-                "items": [],
-            }
-
-        orders[r.order_id]["items"].append({
-            "order_item_id": r.order_item_id,
-            "qty": r.qty,
-            "unit_price": float(r.unit_price),
-            "product": {
-                "product_id": r.product_id,
-                "title": r.product_title,
-                "sku": r.product_sku,
-            },
-        })
+            orders[r.order_id] = _order_dict(r)
+        if r.order_item_id is not None:
+            orders[r.order_id]["items"].append(_item_dict(r, r.product_title, r.product_sku))
+
+    return orders
+
+
+@router.post("/batch-get")
+async def batch_get_orders(
+    payload: OrderIds,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Orders by id, in request order, shaped like list_orders rows."""
+    ids = list(dict.fromkeys(payload.ids))
+    orders = await _fetch_orders(db, ids)
 
     response = {
-        "data": list(orders.values()),
-        "pagination": {
-            "total": total,
-            "limit": limit,
-            "offset": offset,
-            "count": len(orders),
-        },
+        "data": [orders[i] for i in ids if i in orders],
+        "missing": [i for i in ids if i not in orders],
     }
 
-    redis_client.setex(cache_key, 30, dumps(response))
-    return response
+    with ENCODE_SECONDS.labels("orders.batch_get").time():
+        return Response(content=dumps(response), media_type="application/json")
+
+
+@router.patch("/status")
+async def update_order_statuses(
+    payload: StatusChanges,
+    db: AsyncSession = Depends(get_db),
+    cache: RedisCache = Depends(get_cache),
+):
+    """Apply many status transitions in one statement.
+
+    Changes that are not allowed from the order's current status, that would
+    not change it, or that name an unknown order are reported back in
+    `rejected`; the rest are applied.
+    """
+    unknown = {c.status for c in payload.changes} - ORDER_STATUS_TRANSITIONS.keys()
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown statuses: {', '.join(sorted(unknown))}")
+
+    order_ids = [c.order_id for c in payload.changes]
+    if len(set(order_ids)) != len(order_ids):
+        raise HTTPException(status_code=400, detail="Each order may appear only once per request")
+
+    params = {}
+    values = []
+    for i, change in enumerate(payload.changes):
+        values.append(f"(CAST(:order_id_{i} AS integer), CAST(:status_{i} AS varchar))")
+        params[f"order_id_{i}"] = change.order_id
+        params[f"status_{i}"] = change.status
+
+    # `locked` takes the row locks in id order, so two overlapping batches
+    # cannot deadlock, and reads each order's status after any concurrent
+    # update to it has committed. Its created_at completes the primary key,
+    # so the update itself only touches each order's month.
+    sql = f"""
+        WITH changes (order_id, status) AS (
+            VALUES {", ".join(values)}
+        ),
+        transitions (current_status, new_status) AS (
+            VALUES {TRANSITIONS_SQL}
+        ),
+        locked AS (
+            SELECT o.id, o.status, o.created_at
+            FROM orders o
+            WHERE o.id IN (SELECT order_id FROM changes)
+            ORDER BY o.id
+            FOR UPDATE
+        ),
+        updated AS (
+            UPDATE orders o
+            SET status = c.status
+            FROM changes c
+            JOIN locked l ON l.id = c.order_id
+            JOIN transitions t ON t.current_status = l.status AND t.new_status = c.status
+            WHERE o.id = c.order_id AND o.created_at = l.created_at
+            RETURNING o.id
+        )
+        SELECT
+            c.order_id,
+            c.status,
+            l.status AS previous_status,
+            (u.id IS NOT NULL) AS applied
+        FROM changes c
+        LEFT JOIN locked l ON l.id = c.order_id
+        LEFT JOIN updated u ON u.id = c.order_id
+    """
+
+    rows = (await db.execute(text(sql), params, execution_options=query_name("orders.status_update"))).fetchall()
+    await db.commit()
+
+    results = {r.order_id: r for r in rows}
+    updated, rejected = [], []
+
+    for change in payload.changes:
+        r = results[change.order_id]
+        if r.applied:
+            updated.append({"order_id": r.order_id, "previous_status": r.previous_status, "status": r.status})
+        elif r.previous_status is None:
+            rejected.append({"order_id": r.order_id, "status": r.status, "reason": "not_found"})
+        else:
+            rejected.append({
+                "order_id": r.order_id,
+                "status": r.status,
+                "current_status": r.previous_status,
+                "reason": "unchanged" if r.previous_status == r.status else "invalid_transition",
+            })
+
+    # only the unfiltered lists and the old and new status families change
+    if updated:
+        await bump_orders_generation(
+            cache,
+            [u["previous_status"] for u in updated] + [u["status"] for u in updated],
+        )
+        await bump_order_details(cache, [u["order_id"] for u in updated])
+
+    return {"updated": updated, "rejected": rejected}
+
+
+async def _export_orders(
+    search: str | None,
+    status: str | None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+):
+    """Yield orders one at a time with their items grouped in.
+
+    Rows come off a server-side cursor ordered by (o.id, oi.id), so an order
+    is complete as soon as the next order id shows up and only one order is
+    ever held in memory. The export owns its session: it outlives the request
+    dependencies while the response streams.
+    """
+    filter_sql, params = _order_filters(
+        search,
+        status,
+        created_from=created_from,
+        created_to=created_to,
+        created_columns=("o.created_at", "oi.created_at"),
+    )
+    sql = text(f"""
+        {ORDER_ROWS_SQL}
+        WHERE 1=1 {filter_sql}
+        ORDER BY o.id, oi.id
+    """).execution_options(yield_per=EXPORT_BATCH_SIZE, **query_name("orders.export"))
+
+    async with SessionLocal() as session:
+        result = await session.stream(sql, params)
+
+        current = None
+        async for r in result:
+            if current is None or current["order_id"] != r.order_id:
+                if current is not None:
+                    yield current
+                current = _order_dict(r)
+
+            current["items"].append(_item_dict(r, r.product_title, r.product_sku))
+
+        if current is not None:
+            yield current
+
+
+def _ndjson_lines(order):
+    return orjson.dumps(order) + b"\n"
+
+
+def _csv_lines(order):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    for item in order["items"]:
+        writer.writerow([
+            order["order_id"],
+            order["status"],
+            order["total"],
+            order["created_at"],
+            order["user"]["user_id"],
+            order["user"]["name"],
+            order["user"]["email"],
+            item["order_item_id"],
+            item["product"]["product_id"],
+            item["product"]["sku"],
+            item["product"]["title"],
+            item["qty"],
+            item["unit_price"],
+        ])
+
+    return buf.getvalue().encode()
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip: listed (or covered by
+    "*" when not listed) with a q-value above 0."""
+    qualities = {}
+    for part in accept_encoding.lower().split(","):
+        coding, *params = (p.strip() for p in part.split(";"))
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            qualities[coding] = q
+
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+async def _export_stream(orders, encode, header: bytes, compress: bool):
+    # Chunks are flushed every EXPORT_CHUNK_BYTES. If the client goes away,
+    # Starlette cancels this generator mid-iteration and the `async with` in
+    # _export_orders closes the cursor and returns the connection.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def emit(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    chunk = bytearray(header)
+    async for order in orders:
+        chunk += encode(order)
+        if len(chunk) >= EXPORT_CHUNK_BYTES:
+            out = emit(bytes(chunk))
+            chunk.clear()
+            if out:
+                yield out
+
+    out = emit(bytes(chunk))
+    if compressor:
+        out += compressor.flush()
+    if out:
+        yield out
+
+
+@router.get("/export")
+async def export_orders(
+    request: Request,
+    search: str | None = Query(None),
+    status: str | None = Query(None),
+    created_from: datetime | None = Query(None),
+    created_to: datetime | None = Query(None),
+    format: str = Query("ndjson"),
+):
+    if format == "csv":
+        encode, media_type = _csv_lines, "text/csv"
+        header = (",".join(EXPORT_CSV_COLUMNS) + "\r\n").encode()
+    else:
+        format = "ndjson"
+        encode, media_type, header = _ndjson_lines, "application/x-ndjson", b""
+
+    compress = _accepts_gzip(request.headers.get("accept-encoding", ""))
+
+    # the body depends on Accept-Encoding either way
+    headers = {"Content-Disposition": f'attachment; filename="orders.{format}"', "Vary": "Accept-Encoding"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        _export_stream(
+            _export_orders(search, status, _created_at(created_from), _created_at(created_to)),
+            encode,
+            header,
+            compress,
+        ),
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+# Declared last so /export and the other fixed paths are matched first.
+@router.get("/{order_id}")
+async def get_order(
+    order_id: int,
+    request: Request,
+    cache: RedisCache = Depends(get_cache),
+):
+    # Read from the primary, so an order opened right after a write shows
+    # it; the key is versioned by the order's own generation.
+    async def build(session: AsyncSession) -> bytes:
+        orders = await _fetch_orders(session, [order_id])
+        if order_id not in orders:
+            raise HTTPException(status_code=404, detail="Order not found")
+        return dumps(orders[order_id])
+
+    # no key means Redis is unavailable: skip the cache
+    key = await order_detail_key(cache, order_id)
+    if key is None:
+        async with primary_session() as db:
+            body, cache_state = await build(db), "miss"
+    else:
+        body, cache_state = await singleflight.load(
+            cache,
+            key,
+            build,
+            ttl=settings.ORDERS_DETAIL_CACHE_TTL,
+            local=local_cache,
+            session=primary_session,
+        )
+
+    return cached_json_response(request, body, {"X-Cache": cache_state})
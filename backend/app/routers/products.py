@@ -0,0 +1,113 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from typing import Optional
+
+from app.core.metrics import query_name
+from app.db.session import get_db
+from app.utils.catalog import PRODUCT_COLUMNS, catalog
+
+router = APIRouter()
+
+# Allow only safe sortable columns
+SAFE_ORDER_FIELDS = {"id", "title", "sku", "price", "stock", "created_at"}
+
+MAX_BULK_LOOKUP = 500
+
+
+def _split(value: str):
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+@router.get("/")
+async def list_products(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+
+    # Search on title or SKU
+    search: Optional[str] = None,
+
+    # Bulk lookup, comma separated; served from the catalog cache
+    ids: Optional[str] = None,
+    skus: Optional[str] = None,
+
+    # Ordering
+    order_by: str = Query("id"),
+    order_dir: str = Query("asc"),
+
+    db: AsyncSession = Depends(get_db),
+):
+    # --- Bulk lookup ---
+    if ids or skus:
+        try:
+            id_list = [int(v) for v in _split(ids)] if ids else []
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids must be comma separated integers")
+        sku_list = _split(skus) if skus else []
+
+        if len(id_list) + len(sku_list) > MAX_BULK_LOOKUP:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_LOOKUP} ids/skus per request")
+
+        by_id = await catalog.get_many(db, id_list)
+        by_sku = await catalog.get_many_by_sku(db, sku_list)
+
+        # keep request order, drop unknowns and duplicates
+        products = {}
+        for product_id in id_list:
+            if product_id in by_id:
+                products[product_id] = by_id[product_id]
+        for sku in sku_list:
+            if sku in by_sku:
+                products[by_sku[sku]["id"]] = by_sku[sku]
+
+        return {
+            "data": list(products.values()),
+            "missing": {
+                "ids": [i for i in id_list if i not in by_id],
+                "skus": [s for s in sku_list if s not in by_sku],
+            },
+        }
+
+    # --- Validate ordering fields ---
+    if order_by not in SAFE_ORDER_FIELDS:
+        order_by = "id"
+
+    order_dir = order_dir.lower()
+    if order_dir not in {"asc", "desc"}:
+        order_dir = "asc"
+
+    # --- Base query ---
+    sql = f"SELECT {PRODUCT_COLUMNS} FROM products WHERE 1=1"
+    params = {}
+
+    if search:
+        sql += " AND (title ILIKE :search OR sku ILIKE :search)"
+        params["search"] = f"%{search}%"
+
+    sql += f" ORDER BY {order_by} {order_dir.upper()}, id {order_dir.upper()}"
+    sql += " LIMIT :limit OFFSET :offset"
+    params.update({"limit": limit, "offset": offset})
+
+    rows = (await db.execute(text(sql), params, execution_options=query_name("products.list"))).mappings().all()
+    products = [dict(r) for r in rows]
+
+    # listing already paid for the rows, let later lookups hit memory
+    catalog.put_many(products)
+
+    return {
+        "data": products,
+        "pagination": {
+            "limit": limit,
+            "offset": offset,
+            "count": len(products),
+        },
+    }
+
+
+@router.get("/{product_id}")
+async def get_product(product_id: int, db: AsyncSession = Depends(get_db)):
+    product = (await catalog.get_many(db, [product_id])).get(product_id)
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    return product
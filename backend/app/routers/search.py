@@ -0,0 +1,211 @@
+import re
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from typing import Optional
+
+from app.core.metrics import query_name
+from app.db.session import get_read_db
+
+router = APIRouter()
+
+SEARCH_TYPES = {"orders", "customers", "products"}
+
+# trigrams need at least three characters to narrow anything down; shorter
+# tokens use prefix matching instead
+MIN_TRIGRAM_LENGTH = 3
+
+# matches are ranked after they are found, so a very common token would rank
+# the whole table; only this many candidates per entity are ranked
+SEARCH_CANDIDATES = 1000
+
+# order ids are int4
+MAX_ORDER_ID = 2**31 - 1
+
+# the query is tokenized by the same parser that built the documents, and
+# every lexeme becomes a quoted prefix term, so user input never reaches the
+# tsquery syntax
+TSQUERY_SQL = """
+    SELECT to_tsquery('simple', string_agg(quote_literal(lexeme) || ':*', ' & ')) AS tsq
+    FROM unnest(to_tsvector('simple', :q))
+"""
+
+
+def _like_escape(value: str) -> str:
+    return re.sub(r"([\\%_])", r"\\\1", value)
+
+
+async def _search_orders(db: AsyncSession, q: str, tokens: list[str], limit: int):
+    params = {"q": q, "limit": limit, "candidates": SEARCH_CANDIDATES}
+
+    # every token long enough for trigrams: also accept infix matches
+    # ("example.com" inside an email) the prefix tsquery can't see
+    match_sql = "s.document @@ q.tsq"
+    if all(len(t) >= MIN_TRIGRAM_LENGTH for t in tokens):
+        likes = []
+        for i, token in enumerate(tokens):
+            likes.append(f"s.search_text LIKE :like{i}")
+            params[f"like{i}"] = f"%{_like_escape(token.lower())}%"
+        match_sql = f"({match_sql} OR ({' AND '.join(likes)}))"
+
+    # an exact order id always makes the cut and ranks first. isdigit() alone
+    # also accepts digits int() can't parse ("²")
+    exact_sql = ""
+    if q.isascii() and q.isdigit() and int(q) <= MAX_ORDER_ID:
+        exact_sql = "UNION SELECT order_id FROM order_search WHERE order_id = :order_id"
+        params["order_id"] = int(q)
+
+    # the hits are ranked and cut to the page before they are joined to
+    # orders, which by id alone is a primary key probe per monthly partition
+    sql = f"""
+        WITH q AS ({TSQUERY_SQL}),
+        hits AS (
+            (
+                SELECT s.order_id
+                FROM order_search s, q
+                WHERE {match_sql}
+                LIMIT :candidates
+            )
+            {exact_sql}
+        ),
+        ranked AS (
+            SELECT
+                h.order_id,
+                COALESCE(ts_rank_cd(s.document, q.tsq), 0)
+                    + CASE WHEN h.order_id::text = :q THEN 1 ELSE 0 END AS rank
+            FROM hits h
+            CROSS JOIN q
+            JOIN order_search s ON s.order_id = h.order_id
+            ORDER BY rank DESC, h.order_id DESC
+            LIMIT :limit
+        )
+        SELECT
+            o.id AS order_id,
+            o.status,
+            o.total,
+            o.created_at,
+            u.id AS user_id,
+            u.name AS user_name,
+            u.email AS user_email,
+            r.rank
+        FROM ranked r
+        JOIN orders o ON o.id = r.order_id
+        JOIN users u ON u.id = o.user_id
+        ORDER BY r.rank DESC, o.id DESC
+    """
+
+    rows = (await db.execute(text(sql), params, execution_options=query_name("search.orders"))).fetchall()
+
+    return [
+        {
+            "order_id": r.order_id,
+            "status": r.status,
+            "total": r.total,
+            "created_at": r.created_at,
+            "user": {
+                "user_id": r.user_id,
+                "name": r.user_name,
+                "email": r.user_email,
+            },
+            "rank": round(float(r.rank), 4),
+        }
+        for r in rows
+    ]
+
+
+async def _search_entity(
+    db: AsyncSession,
+    q: str,
+    *,
+    table: str,
+    columns: str,
+    fields: tuple[str, str],
+    limit: int,
+    name: str,
+):
+    """Trigram similarity over two text columns, prefix match for short input."""
+    first, second = fields
+
+    if len(q) >= MIN_TRIGRAM_LENGTH:
+        # ILIKE '%..%' is served by the gin_trgm_ops indexes
+        where = f"{first} ILIKE :like OR {second} ILIKE :like"
+        rank = f"GREATEST(similarity({first}, :q), similarity({second}, :q))"
+        params = {"q": q, "like": f"%{_like_escape(q)}%"}
+    else:
+        # lower(col) LIKE 'x%' is served by text_pattern_ops indexes
+        where = f"lower({first}) LIKE :prefix OR lower({second}) LIKE :prefix"
+        rank = f"CASE WHEN lower({first}) = :lower OR lower({second}) = :lower THEN 1.0 ELSE 0.5 END"
+        params = {"lower": q.lower(), "prefix": f"{_like_escape(q.lower())}%"}
+
+    params.update(limit=limit, candidates=SEARCH_CANDIDATES)
+
+    # rank only the first candidates found, as for orders
+    sql = f"""
+        SELECT {columns}, {rank} AS rank
+        FROM (
+            SELECT {columns}
+            FROM {table}
+            WHERE {where}
+            LIMIT :candidates
+        ) candidates
+        ORDER BY rank DESC, id
+        LIMIT :limit
+    """
+
+    rows = (await db.execute(text(sql), params, execution_options=query_name(name))).mappings().all()
+    return [{**r, "rank": round(float(r["rank"]), 4)} for r in rows]
+
+
+@router.get("/")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+
+    # Comma separated subset of orders, customers, products
+    types: Optional[str] = None,
+
+    # Hits per entity type
+    limit: int = Query(10, ge=1, le=50),
+
+    db: AsyncSession = Depends(get_read_db),
+):
+    q = q.strip()
+    tokens = q.split()
+    if not tokens:
+        raise HTTPException(status_code=400, detail="Empty search")
+
+    wanted = SEARCH_TYPES
+    if types:
+        wanted = {t.strip() for t in types.split(",") if t.strip()}
+        unknown = wanted - SEARCH_TYPES
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown search types: {', '.join(sorted(unknown))}")
+
+    results = {}
+
+    if "orders" in wanted:
+        results["orders"] = await _search_orders(db, q, tokens, limit)
+
+    if "customers" in wanted:
+        results["customers"] = await _search_entity(
+            db,
+            q,
+            table="users",
+            columns="id, email, name",
+            fields=("email", "name"),
+            limit=limit,
+            name="search.customers",
+        )
+
+    if "products" in wanted:
+        results["products"] = await _search_entity(
+            db,
+            q,
+            table="products",
+            columns="id, title, sku, price, stock",
+            fields=("sku", "title"),
+            limit=limit,
+            name="search.products",
+        )
+
+    return {"query": q, "results": results}
@@ -1,15 +1,154 @@
-from fastapi import APIRouter, Depends, Query
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from typing import Optional
 
+from app.core.config import settings
+from app.core.metrics import query_name
+from app.db.redis import RedisCache, get_cache
 from app.db.session import get_db
+from app.utils import singleflight
+from app.utils.cache_json import dumps
+from app.utils.catalog import catalog
+from app.utils.counting import COUNT_STRATEGIES, count_rows
+from app.utils.cursor import InvalidCursor, decode_cursor, encode_cursor
+from app.utils.orders_cache import bump_orders_generation
 
 router = APIRouter()
 
 # Allow only safe sortable columns
 SAFE_ORDER_FIELDS = {"id", "email", "name", "created_at"}
 
+# what each sortable column holds, to check the key a cursor carries
+ORDER_FIELD_TYPES = {"id": int, "email": str, "name": str, "created_at": datetime}
+
+# Explicit projection, keep in sync with the (column, id) paging indexes
+USER_COLUMNS = "id, email, name, created_at"
+
+# extras the list can add to each user (include=stats)
+USER_INCLUDES = {"stats"}
+
+
+async def _build_users_page(
+    db: AsyncSession,
+    cache: RedisCache,
+    *,
+    email: Optional[str],
+    name: Optional[str],
+    order_by: str,
+    order_dir: str,
+    limit: int,
+    offset: int,
+    seek,
+    includes: set,
+    count: str,
+) -> bytes:
+    # --- Filtering ---
+    from_sql = " FROM users WHERE 1=1"
+    params = {}
+
+    if email:
+        from_sql += " AND email ILIKE :email"
+        params["email"] = f"%{email}%"
+
+    if name:
+        from_sql += " AND name ILIKE :name"
+        params["name"] = f"%{name}%"
+
+    # --- Total ---
+    total, count_strategy = await count_rows(
+        db,
+        cache,
+        count,
+        from_sql=from_sql,
+        params=params,
+        table="users",
+        filtered=bool(email or name),
+        cache_key=f"users:count:email={email}|name={name}",
+        ttl=settings.USERS_COUNT_CACHE_TTL,
+    )
+
+    # --- Base query ---
+    sql = f"SELECT {USER_COLUMNS}" + from_sql
+    params = dict(params)
+
+    # --- Keyset seek ---
+    if seek:
+        comparator = ">" if order_dir == "asc" else "<"
+        if order_by == "id":
+            sql += f" AND id {comparator} :cursor_id"
+        else:
+            sql += f" AND ({order_by}, id) {comparator} (:cursor_key, :cursor_id)"
+            params["cursor_key"] = seek[0]
+        params["cursor_id"] = seek[1]
+
+    # --- Ordering ---
+    # id breaks ties in the same direction so the seek above stays exact
+    sql += f" ORDER BY {order_by} {order_dir.upper()}, id {order_dir.upper()}"
+
+    # --- Pagination ---
+    sql += " LIMIT :limit"
+    params["limit"] = limit
+
+    if not seek:
+        sql += " OFFSET :offset"
+        params["offset"] = offset
+
+    query = text(sql)
+    result = await db.execute(query, params, execution_options=query_name("users.list"))
+    rows = result.fetchall()
+
+    users = [dict(row._mapping) for row in rows]
+
+    next_cursor = None
+    if users and len(users) == limit:
+        last = users[-1]
+        next_cursor = encode_cursor(order_by, order_dir, last[order_by], last["id"])
+
+    # --- Per-user order stats, one grouped query for the whole page ---
+    if "stats" in includes and users:
+        stats_rows = (
+            await db.execute(
+                text("""
+                    SELECT
+                        user_id,
+                        COUNT(*) AS order_count,
+                        SUM(total) AS lifetime_spend,
+                        MAX(created_at) AS last_order_at
+                    FROM orders
+                    WHERE user_id = ANY(:user_ids)
+                    GROUP BY user_id
+                """),
+                {"user_ids": [u["id"] for u in users]},
+                execution_options=query_name("users.stats"),
+            )
+        ).fetchall()
+
+        stats = {r.user_id: r for r in stats_rows}
+
+        for u in users:
+            r = stats.get(u["id"])
+            u["stats"] = {
+                "order_count": r.order_count if r else 0,
+                "lifetime_spend": float(r.lifetime_spend) if r else 0.0,
+                "last_order_at": r.last_order_at if r else None,
+            }
+
+    return dumps({
+        "data": users,
+        "pagination": {
+            "total": total,
+            "count_strategy": count_strategy,
+            "limit": limit,
+            "offset": None if seek else offset,
+            "count": len(users),
+            "next_cursor": next_cursor,
+        }
+    })
+
+
 @router.get("/")
 async def get_users(
     limit: int = Query(50, ge=1, le=500),
@@ -23,51 +162,340 @@ async def get_users(
     order_by: str = Query("created_at"),
     order_dir: str = Query("desc"),
 
-    db: AsyncSession = Depends(get_db)
+    # Keyset paging: pass pagination.next_cursor instead of offset
+    cursor: Optional[str] = None,
+
+    # Extras: "stats" adds order count, lifetime spend and last order date
+    include: Optional[str] = None,
+
+    # Total: exact | cached | estimate | none
+    count: str = Query("cached"),
+
+    cache: RedisCache = Depends(get_cache),
 ):
     # --- Validate ordering fields ---
     if order_by not in SAFE_ORDER_FIELDS:
         order_by = "created_at"
 
-    if order_dir.lower() not in {"asc", "desc"}:
+    order_dir = order_dir.lower()
+    if order_dir not in {"asc", "desc"}:
         order_dir = "desc"
 
-    # --- Base query ---
-    sql = """
-        SELECT * 
-        FROM users
-        WHERE 1=1
-    """
+    seek = None
+    if cursor:
+        try:
+            seek = decode_cursor(cursor, order_by, order_dir, ORDER_FIELD_TYPES[order_by])
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    params = {}
+    # comma-separated; sorted into the cache key below
+    includes = {i.strip() for i in (include or "").split(",") if i.strip()}
+    unknown = includes - USER_INCLUDES
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown includes: {', '.join(sorted(unknown))}")
 
-    # --- Filtering ---
-    if email:
-        sql += " AND email ILIKE :email"
-        params["email"] = f"%{email}%"
+    if count not in COUNT_STRATEGIES:
+        count = "cached"
 
-    if name:
-        sql += " AND name ILIKE :name"
-        params["name"] = f"%{name}%"
+    cache_key = (
+        f"users:list:email={email}|name={name}|"
+        f"order_by={order_by}|order_dir={order_dir}|"
+        f"limit={limit}|offset={offset}|cursor={cursor}|"
+        f"include={','.join(sorted(includes))}|count={count}"
+    )
 
-    # --- Ordering ---
-    sql += f" ORDER BY {order_by} {order_dir.upper()}"
+    def build(session: AsyncSession):
+        return _build_users_page(
+            session,
+            cache,
+            email=email,
+            name=name,
+            order_by=order_by,
+            order_dir=order_dir,
+            limit=limit,
+            offset=offset,
+            seek=seek,
+            includes=includes,
+            count=count,
+        )
 
-    # --- Pagination ---
-    sql += " LIMIT :limit OFFSET :offset"
-    params.update({"limit": limit, "offset": offset})
+    # stale pages are served while one task refreshes them, concurrent misses
+    # share one computation
+    body, cache_state = await singleflight.load(
+        cache,
+        cache_key,
+        build,
+        ttl=settings.USERS_LIST_CACHE_TTL,
+        stale_ttl=settings.USERS_LIST_STALE_TTL,
+    )
+    return Response(content=body, media_type="application/json", headers={"X-Cache": cache_state})
 
-    query = text(sql)
-    result = await db.execute(query, params)
-    rows = result.fetchall()
 
-    users = [dict(row._mapping) for row in rows]
+# --------------------
+# Checkout
+# --------------------
+class CheckoutFailed(Exception):
+    """The cart can't be turned into an order; nothing was changed."""
+
 
+# A checkout is two statements. The first writes the order: prices and
+# stock as of its snapshot, the order and its items in bulk (items carry
+# their order's created_at, as the partitioning requires), the cart emptied
+# and the order recorded against the idempotency key. Nothing is inserted if
+# any product is already short, so once a product sells out further
+# checkouts stop here without locking it.
+CHECKOUT_PLACE_SQL = """
+    WITH wanted (product_id, qty) AS (
+        SELECT * FROM unnest(CAST(:product_ids AS integer[]), CAST(:qtys AS integer[]))
+    ),
+    priced AS (
+        SELECT w.product_id, w.qty, p.price, p.stock
+        FROM wanted w
+        JOIN products p ON p.id = w.product_id
+    ),
+    new_order AS (
+        INSERT INTO orders (user_id, status, total, created_at)
+        SELECT :user_id, 'pending', SUM(qty * price), now()
+        FROM priced
+        HAVING COUNT(*) FILTER (WHERE stock < qty) = 0
+        RETURNING id, total, created_at
+    ),
+    new_items AS (
+        INSERT INTO order_items (order_id, product_id, qty, unit_price, created_at)
+        SELECT o.id, p.product_id, p.qty, p.price, o.created_at
+        FROM new_order o
+        CROSS JOIN priced p
+        RETURNING id, product_id, unit_price
+    ),
+    emptied AS (
+        DELETE FROM cart_items
+        WHERE id = ANY(CAST(:cart_item_ids AS integer[])) AND EXISTS (SELECT 1 FROM new_order)
+    ),
+    recorded AS (
+        UPDATE checkout_requests
+        SET order_id = o.id, order_created_at = o.created_at
+        FROM new_order o
+        WHERE user_id = :user_id AND idempotency_key = :idempotency_key
+    )
+    SELECT
+        p.product_id,
+        p.qty,
+        p.stock AS available,
+        o.id AS order_id,
+        o.total,
+        o.created_at,
+        i.id AS order_item_id,
+        i.unit_price
+    FROM priced p
+    LEFT JOIN new_order o ON true
+    LEFT JOIN new_items i ON i.product_id = p.product_id
+    ORDER BY i.id, p.product_id
+"""
+
+# The second reserves the stock, last, so the product row locks (the
+# contended part during a sale) are held for one statement and the commit.
+# `locked` takes them in id order, so checkouts sharing products cannot
+# deadlock; NO KEY UPDATE leaves the order_items foreign key checks on those
+# products unblocked. The conditional UPDATE then sees each product's stock
+# as of the lock, after any checkout ahead of it committed, and skips those
+# without enough; the caller rolls back unless every product was reserved.
+CHECKOUT_RESERVE_SQL = """
+    WITH wanted (product_id, qty) AS (
+        SELECT * FROM unnest(CAST(:product_ids AS integer[]), CAST(:qtys AS integer[]))
+    ),
+    locked AS (
+        SELECT p.id, p.stock
+        FROM products p
+        WHERE p.id = ANY(CAST(:product_ids AS integer[]))
+        ORDER BY p.id
+        FOR NO KEY UPDATE
+    ),
+    reserved AS (
+        UPDATE products p
+        SET stock = p.stock - w.qty
+        FROM wanted w
+        JOIN locked l ON l.id = w.product_id
+        WHERE p.id = w.product_id AND p.stock >= w.qty
+        RETURNING p.id
+    )
+    SELECT w.product_id, w.qty, l.stock AS available, (r.id IS NOT NULL) AS reserved
+    FROM wanted w
+    LEFT JOIN locked l ON l.id = w.product_id
+    LEFT JOIN reserved r ON r.id = w.product_id
+"""
+
+# the order a checkout request created, as checkout returns it
+CHECKOUT_REPLAY_SQL = """
+    SELECT
+        o.id AS order_id,
+        o.status,
+        o.total,
+        o.created_at,
+        oi.id AS order_item_id,
+        oi.product_id,
+        oi.qty,
+        oi.unit_price
+    FROM checkout_requests r
+    JOIN orders o ON o.id = r.order_id AND o.created_at = r.order_created_at
+    JOIN order_items oi ON oi.order_id = o.id AND oi.created_at = o.created_at
+    WHERE r.user_id = :user_id AND r.idempotency_key = :idempotency_key
+    ORDER BY oi.id
+"""
+
+
+def _checkout_order(rows, status: str) -> dict:
     return {
-        "data": users,
-        "pagination": {
-            "limit": limit,
-            "offset": offset,
-            "count": len(users)
-        }
+        "order_id": rows[0].order_id,
+        "status": status,
+        "total": float(rows[0].total),
+        "created_at": rows[0].created_at,
+        "items": [
+            {
+                "order_item_id": r.order_item_id,
+                "product_id": r.product_id,
+                "qty": r.qty,
+                "unit_price": float(r.unit_price),
+            }
+            for r in rows
+        ],
     }
+
+
+def _insufficient_stock(rows):
+    short = sorted(r.product_id for r in rows if r.available is None or r.available < r.qty)
+    raise CheckoutFailed(f"Insufficient stock for products: {', '.join(map(str, short))}")
+
+
+async def checkout_cart(db: AsyncSession, user_id: int, idempotency_key: str) -> tuple[dict, bool]:
+    """Turn the user's cart into a pending order in one transaction.
+
+    Returns (order, replayed): a key already used by this user returns the
+    order it created (waiting for it if that checkout is still running).
+    Raises LookupError for an unknown user and CheckoutFailed for an empty
+    cart or missing stock; either way the transaction is rolled back.
+    """
+    try:
+        if (
+            await db.execute(
+                text("SELECT 1 FROM users WHERE id = :user_id"),
+                {"user_id": user_id},
+                execution_options=query_name("checkout.user"),
+            )
+        ).first() is None:
+            raise LookupError("User not found")
+
+        # claiming the key waits on a concurrent checkout holding it, until
+        # that one commits (replay) or rolls back (this one proceeds)
+        claimed = (
+            await db.execute(
+                text("""
+                    INSERT INTO checkout_requests (user_id, idempotency_key)
+                    VALUES (:user_id, :idempotency_key)
+                    ON CONFLICT DO NOTHING
+                    RETURNING 1
+                """),
+                {"user_id": user_id, "idempotency_key": idempotency_key},
+                execution_options=query_name("checkout.claim"),
+            )
+        ).first()
+
+        if claimed is None:
+            rows = (
+                await db.execute(
+                    text(CHECKOUT_REPLAY_SQL),
+                    {"user_id": user_id, "idempotency_key": idempotency_key},
+                    execution_options=query_name("checkout.replay"),
+                )
+            ).fetchall()
+            if not rows:
+                raise CheckoutFailed("The order placed with this key no longer exists")
+            return _checkout_order(rows, rows[0].status), True
+
+        # locking the cart makes a second checkout of it (another key) wait
+        # and then find it empty
+        cart = (
+            await db.execute(
+                text("""
+                    SELECT id, product_id, qty
+                    FROM cart_items
+                    WHERE user_id = :user_id
+                    ORDER BY id
+                    FOR UPDATE
+                """),
+                {"user_id": user_id},
+                execution_options=query_name("checkout.cart"),
+            )
+        ).fetchall()
+        if not cart:
+            raise CheckoutFailed("Cart is empty")
+
+        wanted = {}
+        for r in cart:
+            wanted[r.product_id] = wanted.get(r.product_id, 0) + r.qty
+
+        params = {"product_ids": list(wanted), "qtys": list(wanted.values())}
+
+        rows = (
+            await db.execute(
+                text(CHECKOUT_PLACE_SQL),
+                {
+                    **params,
+                    "user_id": user_id,
+                    "idempotency_key": idempotency_key,
+                    "cart_item_ids": [r.id for r in cart],
+                },
+                execution_options=query_name("checkout.place"),
+            )
+        ).fetchall()
+
+        if rows[0].order_id is None:
+            _insufficient_stock(rows)
+
+        reservations = (
+            await db.execute(text(CHECKOUT_RESERVE_SQL), params, execution_options=query_name("checkout.reserve"))
+        ).fetchall()
+
+        if not all(r.reserved for r in reservations):
+            _insufficient_stock(reservations)
+
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    return _checkout_order(rows, "pending"), False
+
+
+@router.post("/{user_id}/checkout", status_code=201)
+async def checkout(
+    user_id: int,
+    idempotency_key: str = Header(..., alias="Idempotency-Key", min_length=1, max_length=255),
+    db: AsyncSession = Depends(get_db),
+    cache: RedisCache = Depends(get_cache),
+):
+    """Place an order for everything in the user's cart.
+
+    All or nothing: if any product is short of stock, nothing is reserved
+    and the cart is left as it was (409). Retries with the same
+    Idempotency-Key return the original order with Idempotent-Replayed set.
+    """
+    try:
+        order, replayed = await checkout_cart(db, user_id, idempotency_key)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except CheckoutFailed as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if not replayed:
+        # a new pending order: the unfiltered and pending lists change
+        await bump_orders_generation(cache, ["pending"])
+        # and its products' stock; other workers reload theirs after
+        # CATALOG_CACHE_TTL
+        catalog.invalidate([item["product_id"] for item in order["items"]])
+
+    return Response(
+        content=dumps(order),
+        status_code=201,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true" if replayed else "false"},
+    )
@@ -1,7 +1,46 @@
+import hashlib
+
 import orjson
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
 
-def dumps(obj) -> str:
-    return orjson.dumps(obj).decode("utf-8")
+# Cached payloads are kept as the exact bytes sent to the client, so a cache
+# hit is written straight back out without decoding or re-encoding.
+def dumps(obj) -> bytes:
+    return orjson.dumps(obj)
 
 def loads(s: str | bytes):
     return orjson.loads(s)
+
+
+class ORJSONResponse(JSONResponse):
+    """Default response class, orjson instead of the stdlib encoder."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def etag(body: bytes) -> str:
+    """Strong validator for an encoded body: the same bytes, the same tag."""
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def _matches(if_none_match: str | None, tag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    # If-None-Match uses the weak comparison, so W/"x" matches "x"
+    return any(t.strip().removeprefix("W/") == tag for t in if_none_match.split(","))
+
+
+def cached_json_response(request: Request, body: bytes, headers: dict | None = None) -> Response:
+    """Return an encoded JSON body with an ETag, or a bodiless 304 when the
+    client already holds it."""
+    headers = {**(headers or {}), "ETag": etag(body), "Cache-Control": "no-cache"}
+
+    if _matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
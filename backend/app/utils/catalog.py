@@ -0,0 +1,129 @@
+import time
+from collections import OrderedDict
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import CACHE_REQUESTS, query_name
+
+PRODUCT_COLUMNS = "id, title, sku, price, stock, created_at"
+
+
+class ProductCatalog:
+    """Per-worker LRU of product rows keyed by id.
+
+    Entries older than `ttl` seconds are treated as misses and reloaded, which
+    is how title/price/stock edits made elsewhere reach this worker. Products
+    are read-mostly, so a bounded in-process copy saves a join or a round trip
+    on every order page.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        self._sku_ids: dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get(self, product_id: int, now: float):
+        entry = self._entries.get(product_id)
+        if entry is None:
+            return None
+
+        expires_at, product = entry
+        if expires_at < now:
+            return None
+
+        self._entries.move_to_end(product_id)
+        return product
+
+    def put_many(self, products):
+        expires_at = time.monotonic() + self.ttl
+
+        for product in products:
+            self._entries[product["id"]] = (expires_at, product)
+            self._entries.move_to_end(product["id"])
+            self._sku_ids[product["sku"]] = product["id"]
+
+        while len(self._entries) > self.maxsize:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            if self._sku_ids.get(evicted["sku"]) == evicted["id"]:
+                del self._sku_ids[evicted["sku"]]
+
+    def invalidate(self, product_ids=None):
+        if product_ids is None:
+            self._entries.clear()
+            self._sku_ids.clear()
+            return
+
+        for product_id in product_ids:
+            entry = self._entries.pop(product_id, None)
+            if entry and self._sku_ids.get(entry[1]["sku"]) == product_id:
+                del self._sku_ids[entry[1]["sku"]]
+
+    async def get_many(self, db: AsyncSession, product_ids) -> dict[int, dict]:
+        now = time.monotonic()
+        found = {}
+        missing = []
+
+        for product_id in set(product_ids):
+            product = self._get(product_id, now)
+            if product is None:
+                missing.append(product_id)
+            else:
+                found[product_id] = product
+
+        CACHE_REQUESTS.labels("catalog", "hit").inc(len(found))
+        CACHE_REQUESTS.labels("catalog", "miss").inc(len(missing))
+
+        if missing:
+            rows = (
+                await db.execute(
+                    text(f"SELECT {PRODUCT_COLUMNS} FROM products WHERE id = ANY(:ids)"),
+                    {"ids": missing},
+                    execution_options=query_name("products.lookup"),
+                )
+            ).mappings().all()
+
+            products = [dict(r) for r in rows]
+            self.put_many(products)
+            found.update((p["id"], p) for p in products)
+
+        return found
+
+    async def get_many_by_sku(self, db: AsyncSession, skus) -> dict[str, dict]:
+        now = time.monotonic()
+        found = {}
+        missing = []
+
+        for sku in set(skus):
+            product_id = self._sku_ids.get(sku)
+            product = self._get(product_id, now) if product_id is not None else None
+            if product is None or product["sku"] != sku:
+                missing.append(sku)
+            else:
+                found[sku] = product
+
+        CACHE_REQUESTS.labels("catalog", "hit").inc(len(found))
+        CACHE_REQUESTS.labels("catalog", "miss").inc(len(missing))
+
+        if missing:
+            rows = (
+                await db.execute(
+                    text(f"SELECT {PRODUCT_COLUMNS} FROM products WHERE sku = ANY(:skus)"),
+                    {"skus": missing},
+                    execution_options=query_name("products.lookup"),
+                )
+            ).mappings().all()
+
+            products = [dict(r) for r in rows]
+            self.put_many(products)
+            found.update((p["sku"], p) for p in products)
+
+        return found
+
+
+catalog = ProductCatalog(settings.CATALOG_CACHE_SIZE, settings.CATALOG_CACHE_TTL)
@@ -0,0 +1,93 @@
+import orjson
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import query_name
+from app.db.redis import RedisCache
+
+# exact     COUNT(*) on every request
+# cached    exact COUNT(*) stored under a key built from the filters only, so
+#           paging through one result set counts it once
+# estimate  planner row estimate, or pg_class.reltuples when unfiltered
+# none      skip the total altogether
+COUNT_STRATEGIES = {"exact", "cached", "estimate", "none"}
+
+
+async def _exact_count(db: AsyncSession, from_sql: str, params: dict, table: str) -> int:
+    return (
+        await db.execute(
+            text(f"SELECT COUNT(*) {from_sql}"),
+            params,
+            execution_options=query_name(f"{table}.count"),
+        )
+    ).scalar() or 0
+
+
+async def _estimated_count(db: AsyncSession, from_sql: str, params: dict, table: str, filtered: bool) -> int:
+    if not filtered:
+        # a partitioned table holds no rows itself: sum its partitions (a
+        # plain table is its own only leaf). reltuples is -1 until a table
+        # has been vacuumed or analyzed once.
+        reltuples, analyzed = (
+            await db.execute(
+                text("""
+                    SELECT SUM(GREATEST(c.reltuples, 0))::bigint, MAX(c.reltuples) >= 0
+                    FROM pg_partition_tree(CAST(:table AS regclass)) t
+                    JOIN pg_class c ON c.oid = t.relid
+                    WHERE t.isleaf
+                """),
+                {"table": table},
+                execution_options=query_name(f"{table}.estimate"),
+            )
+        ).one()
+
+        if analyzed:
+            return reltuples
+
+    plan = (
+        await db.execute(
+            text(f"EXPLAIN (FORMAT JSON) SELECT 1 {from_sql}"),
+            params,
+            execution_options=query_name(f"{table}.estimate"),
+        )
+    ).scalar()
+    if isinstance(plan, str):
+        plan = orjson.loads(plan)
+
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_rows(
+    db: AsyncSession,
+    cache: RedisCache,
+    strategy: str,
+    *,
+    from_sql: str,
+    params: dict,
+    table: str,
+    filtered: bool,
+    cache_key: str | None = None,
+    ttl: int = 60,
+):
+    """Return (total, strategy actually used).
+
+    from_sql is everything after the SELECT list ("FROM ... WHERE ..."); table
+    also names the statements in metrics. A cached count without a cache_key
+    (Redis unavailable) degrades to exact.
+    """
+    if strategy == "none":
+        return None, "none"
+
+    if strategy == "estimate":
+        return await _estimated_count(db, from_sql, params, table, filtered), "estimate"
+
+    if strategy == "cached" and cache_key:
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            return int(cached), "cached"
+
+        total = await _exact_count(db, from_sql, params, table)
+        await cache.setex(cache_key, ttl, total)
+        return total, "cached"
+
+    return await _exact_count(db, from_sql, params, table), "exact"
@@ -0,0 +1,57 @@
+import base64
+import binascii
+from datetime import datetime
+
+import orjson
+
+
+# keys and ids bind as int4 parameters
+INT4_MIN, INT4_MAX = -(2**31), 2**31 - 1
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _valid_key(key, key_type: type) -> bool:
+    if key_type is datetime:
+        # timestamptz columns: an offset-less time would be read as UTC
+        return isinstance(key, datetime) and key.tzinfo is not None
+    if key_type is int:
+        # bool is an int subclass, but never a sort key
+        return type(key) is int and INT4_MIN <= key <= INT4_MAX
+    return type(key) is key_type
+
+
+def encode_cursor(sort: str, order: str, key, last_id: int) -> str:
+    payload = {"s": sort, "o": order, "id": last_id}
+
+    # datetimes are tagged so they round-trip back into real datetimes,
+    # asyncpg refuses ISO strings for timestamptz parameters
+    if isinstance(key, datetime):
+        payload["k"] = key.isoformat()
+        payload["t"] = "dt"
+    else:
+        payload["k"] = key
+
+    return base64.urlsafe_b64encode(orjson.dumps(payload)).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, sort: str, order: str, key_type: type):
+    """The (key, last id) a cursor carries. The key must be a `key_type`, the
+    Python type of the sort column's values; anything else is InvalidCursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = orjson.loads(raw)
+        key, last_id = payload["k"], int(payload["id"])
+        if payload.get("t") == "dt":
+            key = datetime.fromisoformat(key)
+    except (binascii.Error, orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+        raise InvalidCursor("Malformed cursor")
+
+    if payload.get("s") != sort or payload.get("o") != order:
+        raise InvalidCursor("Cursor was issued for a different sort order")
+    if not _valid_key(key, key_type) or not _valid_key(last_id, int):
+        raise InvalidCursor("Malformed cursor")
+
+    return key, last_id
@@ -0,0 +1,132 @@
+import logging
+import time
+from collections import OrderedDict
+
+import orjson
+
+from app.core.config import settings
+from app.core.metrics import CACHE_EVICTIONS, CACHE_REQUESTS, CACHE_SIZE_BYTES, LOCAL_CACHE_REQUESTS
+from app.db.redis import RedisCache
+
+logger = logging.getLogger(__name__)
+
+# Workers drop keys from their local tier when one of them publishes the key
+# list on this channel (JSON array, or null for everything).
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+class LocalCache:
+    """Per-worker LRU of encoded values, bounded by entry count and bytes.
+
+    Sits in front of Redis for the hottest keys, so a hit costs no round trip.
+    Entries live at most `ttl` seconds; writes in other workers reach this one
+    through invalidation messages, and the TTL bounds how stale an entry gets
+    if a message is missed.
+    """
+
+    def __init__(self, name: str, max_entries: int, max_bytes: int, ttl: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+
+        # bumped by every invalidation; see set()
+        self.version = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(key) + len(entry[1])
+
+    def get(self, key: str, kind: str = "page") -> bytes | None:
+        """The live value for key, or None. `kind` (generation or page) only
+        labels the lookup in local_cache_requests_total."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                CACHE_REQUESTS.labels(self.name, "hit").inc()
+                LOCAL_CACHE_REQUESTS.labels(kind, "hit").inc()
+                return entry[1]
+            self._remove(key)
+
+        CACHE_REQUESTS.labels(self.name, "miss").inc()
+        LOCAL_CACHE_REQUESTS.labels(kind, "miss").inc()
+        return None
+
+    def set(self, key: str, value: bytes, ttl: float | None = None, version: int | None = None):
+        """Store value for min(ttl, self.ttl) seconds.
+
+        Pass the `version` read before fetching value from Redis: if an
+        invalidation arrived in between, the value may predate it and is not
+        stored.
+        """
+        if version is not None and version != self.version:
+            return
+
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return
+
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            evicted_key, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted_key) + len(evicted)
+            CACHE_EVICTIONS.labels(self.name).inc()
+
+        CACHE_SIZE_BYTES.labels(self.name).set(self._bytes)
+
+    def invalidate(self, keys=None):
+        """Drop keys from this worker only; None drops everything."""
+        self.version += 1
+
+        if keys is None:
+            self._entries.clear()
+            self._bytes = 0
+        else:
+            for key in keys:
+                self._remove(key)
+
+        CACHE_SIZE_BYTES.labels(self.name).set(self._bytes)
+
+
+local_cache = LocalCache(
+    "local",
+    settings.LOCAL_CACHE_MAX_ENTRIES,
+    settings.LOCAL_CACHE_MAX_BYTES,
+    settings.LOCAL_CACHE_TTL,
+)
+
+
+async def invalidate(cache: RedisCache, keys: list[str] | None = None):
+    """Drop keys (None: everything) from the local tier of every worker."""
+    local_cache.invalidate(keys)
+    await cache.publish(INVALIDATION_CHANNEL, orjson.dumps(keys))
+
+
+def _on_invalidation(data: bytes):
+    try:
+        keys = orjson.loads(data)
+    except orjson.JSONDecodeError:
+        logger.warning("malformed cache invalidation %r, dropping everything", data)
+        keys = None
+
+    local_cache.invalidate(keys)
+
+
+async def listen_for_invalidations(cache: RedisCache):
+    """Apply other workers' invalidations until cancelled (run as a task)."""
+    # anything published while unsubscribed is lost, so start over empty
+    await cache.listen(INVALIDATION_CHANNEL, _on_invalidation, on_reset=local_cache.invalidate)
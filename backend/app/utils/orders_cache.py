@@ -0,0 +1,146 @@
+import math
+import time
+from contextlib import asynccontextmanager
+
+from app.core.config import settings
+from app.db.redis import RedisCache
+from app.db.session import primary_session, read_session
+from app.utils.local_cache import invalidate, local_cache
+
+# Every orders list cache key embeds the generations below, so a write makes a
+# whole family of cached pages unreachable with a single INCR and the old
+# entries simply age out. Nothing is ever SCANned or DELeted.
+#
+#   orders:gen                 epoch, part of every key; bumped when a change
+#                              can affect any list (deletes, renames, reseeds)
+#   orders:gen:all             lists without a status filter
+#   orders:gen:status:<name>   lists filtered to one status
+#
+# Generations are also held in the per-worker local tier, so a hot page can be
+# served without touching Redis at all; bumps are announced over pub/sub to
+# drop them everywhere.
+
+EPOCH_KEY = "orders:gen"
+ALL_STATUSES_KEY = "orders:gen:all"
+
+# Set by every bump for as long as the replica may not have replayed the
+# write yet (READ_REPLICA_MAX_LAG plus a health check interval). Pages
+# computed meanwhile are cached under the new generation, so they are read
+# from the primary: a replica read could cache the rows from before the
+# write for the page's whole lifetime.
+RECENT_WRITE_KEY = "orders:written"
+
+
+def status_generation_key(status: str) -> str:
+    return f"orders:gen:status:{status}"
+
+
+# Single orders are versioned too, each by a generation of its own that
+# writes replace, so a write touches only its own entries. A detail read that
+# raced a write stores the old order under the old generation, where nobody
+# looks any more; deleting the entry instead would lose that race. The
+# generation lives as long as the entries it versions: once it expires, a
+# new one is seeded and the next read is a miss. Detail keys embed the epoch
+# as well, so a reseed or a dropped partition, which can reuse or remove any
+# id, drops them all.
+def order_detail_generation_key(order_id: int) -> str:
+    return f"orders:detail:gen:{order_id}"
+
+
+async def order_detail_key(cache: RedisCache, order_id: int) -> str | None:
+    """The order's detail cache key under the epoch and its current
+    generation; None when Redis is unavailable."""
+    keys = [EPOCH_KEY, order_detail_generation_key(order_id)]
+
+    version = local_cache.version
+    values = [local_cache.get(key, kind="generation") for key in keys]
+    if None in values:
+        values = await cache.mget(keys)
+        if values is None:
+            return None
+
+        if None in values:
+            # seeded from the clock, like the list generations; the order's
+            # own expires with its entries
+            epoch, generation = keys
+            now = time.time_ns()
+            await cache.setnx_many({epoch: now})
+            await cache.setnx_many({generation: now}, ttl=settings.ORDERS_DETAIL_CACHE_TTL)
+            values = await cache.mget(keys)
+            if values is None or None in values:
+                return None
+
+        for key, value in zip(keys, values):
+            local_cache.set(key, value, version=version)
+
+    return f"orders:detail:{order_id}:g={'.'.join(str(int(v)) for v in values)}"
+
+
+async def orders_generation(cache: RedisCache, status: str | None) -> str | None:
+    keys = [EPOCH_KEY, status_generation_key(status) if status else ALL_STATUSES_KEY]
+
+    version = local_cache.version
+    values = [local_cache.get(key, kind="generation") for key in keys]
+    if None not in values:
+        return ".".join(str(int(v)) for v in values)
+
+    values = await cache.mget(keys)
+    if values is None:
+        return None
+
+    if None in values:
+        # A generation that is missing (first boot, eviction) must not restart
+        # at 0 and resurrect pages cached under an earlier 0, so seed it from
+        # the clock instead.
+        await cache.setnx_many({key: time.time_ns() for key in keys})
+        values = await cache.mget(keys)
+        if values is None or None in values:
+            return None
+
+    for key, value in zip(keys, values):
+        local_cache.set(key, value, version=version)
+
+    return ".".join(str(int(v)) for v in values)
+
+
+async def bump_orders_generation(cache: RedisCache, statuses=None):
+    """Invalidate cached order lists.
+
+    Pass the statuses of every row touched (old and new values) to only drop
+    the unfiltered lists and those status families; pass None to drop all.
+    """
+    if statuses is None:
+        keys = [EPOCH_KEY]
+    else:
+        keys = [ALL_STATUSES_KEY] + [status_generation_key(s) for s in set(statuses)]
+
+    result = await cache.incr_many(keys)
+    if settings.READ_DATABASE_URL:
+        window = settings.READ_REPLICA_MAX_LAG + settings.READ_REPLICA_CHECK_INTERVAL
+        await cache.setex(RECENT_WRITE_KEY, math.ceil(window), 1)
+    await invalidate(cache, keys)
+    return result
+
+
+@asynccontextmanager
+async def orders_read_session(cache: RedisCache):
+    """read_session(), but the primary while a write may not have reached
+    the replica (see RECENT_WRITE_KEY). Redis being down means nothing gets
+    cached, so the replica is fine then."""
+    primary = False
+    if settings.READ_DATABASE_URL:
+        values = await cache.mget([RECENT_WRITE_KEY])
+        primary = values is not None and values[0] is not None
+
+    async with (primary_session() if primary else read_session()) as db:
+        yield db
+
+
+async def bump_order_details(cache: RedisCache, order_ids):
+    """Move the orders' details to new generations. Call after the write has
+    committed."""
+    # the clock rather than INCR: an expired generation must not restart at
+    # a value some still-cached entry was stored under
+    keys = [order_detail_generation_key(i) for i in order_ids]
+    await cache.setex_many(dict.fromkeys(keys, time.time_ns()), settings.ORDERS_DETAIL_CACHE_TTL)
+    await invalidate(cache, keys)
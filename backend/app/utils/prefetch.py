@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+from app.core.metrics import PREFETCH_REQUESTS
+from app.db.session import pool_deadline, read_pool_usage
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """Runs best-effort background loads for work a client is likely to ask
+    for next.
+
+    At most `rate` loads start per second (in bursts of up to `burst`), one
+    per key at a time. While the read pool is more than `max_pool_usage`
+    checked out nothing starts for `backoff` seconds: prefetching only uses
+    spare connections and never queues in front of real requests.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, max_pool_usage: float, backoff: float):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_pool_usage = max_pool_usage
+        self.backoff = backoff
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def _take_token(self, now: float) -> bool:
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def submit(self, key: str, load) -> bool:
+        """Start load() (a coroutine function) unless throttled; returns
+        whether it was started."""
+        if key in self._tasks:
+            PREFETCH_REQUESTS.labels(self.name, "duplicate").inc()
+            return False
+
+        now = time.monotonic()
+        if now < self._paused_until:
+            PREFETCH_REQUESTS.labels(self.name, "pool_busy").inc()
+            return False
+
+        if read_pool_usage() > self.max_pool_usage:
+            self._paused_until = now + self.backoff
+            PREFETCH_REQUESTS.labels(self.name, "pool_busy").inc()
+            return False
+
+        if not self._take_token(now):
+            PREFETCH_REQUESTS.labels(self.name, "rate_limited").inc()
+            return False
+
+        PREFETCH_REQUESTS.labels(self.name, "started").inc()
+        task = asyncio.ensure_future(self._run(key, load))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return True
+
+    async def _run(self, key: str, load):
+        # outlives the request that started it, so not bound by its deadline;
+        # submit() already checked for spare connections
+        pool_deadline.set(None)
+        try:
+            await load()
+        except Exception:
+            PREFETCH_REQUESTS.labels(self.name, "failed").inc()
+            logger.exception("prefetch of %s failed", key)
+
+    def cancel(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+
+
+prefetcher = Prefetcher(
+    "orders",
+    settings.PREFETCH_RATE,
+    settings.PREFETCH_BURST,
+    settings.PREFETCH_MAX_POOL_USAGE,
+    settings.PREFETCH_BACKOFF,
+)
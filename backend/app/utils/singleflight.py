@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import secrets
+import time
+from functools import partial
+
+from app.core.config import settings
+from app.core.metrics import SINGLEFLIGHT_REQUESTS
+from app.db.redis import RedisCache
+from app.db.session import pool_deadline, read_session
+from app.utils.local_cache import LocalCache
+
+logger = logging.getLogger(__name__)
+
+# Cached list pages, loaded at most once at a time per key.
+#
+# Entries carry a soft expiry in front of the body ("<fresh until>\n<body>")
+# and live in Redis for ttl + stale_ttl seconds (the hard expiry):
+#
+#   fresh   before the soft expiry, served as-is
+#   stale   between the two, served as-is while one background task per key
+#           recomputes it
+#   miss    gone, computed in the request
+#
+# Computations are coalesced the same way for misses and refreshes:
+#
+#   within a worker   callers with the same key await one shared task
+#   across workers    the first worker takes "<key>:lock" (SET NX PX); on a
+#                     miss the others poll for the value it stores and only
+#                     compute themselves if the lock holder dies or times
+#                     out, on a refresh they just keep serving stale
+#
+# Redis being down degrades to per-worker coalescing only.
+#
+# With a `local` tier, fresh entries are also kept in-process until their soft
+# expiry (or the tier's shorter TTL), and served from there without a Redis
+# round trip. Page keys are versioned by generation, so they never need
+# invalidating; only the generations do (see orders_cache).
+
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def _wrap(body: bytes, ttl: int) -> bytes:
+    return b"%.3f\n" % (time.time() + ttl) + body
+
+
+def _unwrap(value: bytes) -> tuple[float, bytes] | None:
+    fresh_until, _, body = value.partition(b"\n")
+    try:
+        return float(fresh_until), body
+    except ValueError:
+        # written before entries carried an expiry; treat as a miss
+        return None
+
+
+async def _store(cache: RedisCache, local: LocalCache | None, key: str, ttl: int, stale_ttl: int, body: bytes):
+    await cache.setex(key, ttl + stale_ttl, _wrap(body, ttl))
+    if local is not None:
+        local.set(key, body, ttl)
+
+
+async def _compute_and_store(
+    cache: RedisCache,
+    local: LocalCache | None,
+    key: str,
+    ttl: int,
+    stale_ttl: int,
+    compute,
+) -> bytes:
+    lock_key = f"{key}:lock"
+    token = secrets.token_hex(8)
+    lock_ttl_ms = int(settings.SINGLEFLIGHT_LOCK_TTL * 1000)
+
+    if await cache.acquire_lock(lock_key, token, lock_ttl_ms) is False:
+        deadline = time.monotonic() + settings.SINGLEFLIGHT_LOCK_TTL
+        while time.monotonic() < deadline:
+            await asyncio.sleep(settings.SINGLEFLIGHT_POLL_INTERVAL)
+            values = await cache.mget([key, lock_key])
+            if values is None:
+                break
+            value, holder = values
+            if value is not None:
+                entry = _unwrap(value)
+                if entry is not None:
+                    SINGLEFLIGHT_REQUESTS.labels("remote").inc()
+                    return entry[1]
+            elif holder is None:
+                # the holder gave up without storing anything
+                break
+
+        SINGLEFLIGHT_REQUESTS.labels("fallback").inc()
+        body = await compute()
+        await _store(cache, local, key, ttl, stale_ttl, body)
+        return body
+
+    try:
+        SINGLEFLIGHT_REQUESTS.labels("leader").inc()
+        body = await compute()
+        await _store(cache, local, key, ttl, stale_ttl, body)
+        return body
+    finally:
+        await cache.release_lock(lock_key, token)
+
+
+async def _run(session, compute) -> bytes:
+    async with session() as db:
+        return await compute(db)
+
+
+async def _refresh(cache: RedisCache, local: LocalCache | None, key: str, ttl: int, stale_ttl: int, compute):
+    # outlives the request that started it, so not bound by its deadline
+    pool_deadline.set(None)
+
+    lock_key = f"{key}:lock"
+    token = secrets.token_hex(8)
+    lock_ttl_ms = int(settings.SINGLEFLIGHT_LOCK_TTL * 1000)
+
+    # another worker is already refreshing (or loading) this key
+    if await cache.acquire_lock(lock_key, token, lock_ttl_ms) is False:
+        return
+
+    try:
+        body = await compute()
+        await _store(cache, local, key, ttl, stale_ttl, body)
+        SINGLEFLIGHT_REQUESTS.labels("refresh").inc()
+        return body
+    except Exception:
+        logger.exception("background refresh of %s failed, serving stale", key)
+    finally:
+        await cache.release_lock(lock_key, token)
+
+
+def _start(key: str, coro) -> asyncio.Task:
+    task = asyncio.ensure_future(coro)
+    _inflight[key] = task
+
+    def done(_):
+        # a newer task may have taken the key since
+        if _inflight.get(key) is task:
+            del _inflight[key]
+
+    task.add_done_callback(done)
+    return task
+
+
+async def load(
+    cache: RedisCache,
+    key: str,
+    compute,
+    *,
+    ttl: int,
+    stale_ttl: int = 0,
+    local: LocalCache | None = None,
+    session=read_session,
+) -> tuple[bytes, str]:
+    """Return (encoded body, "fresh" | "stale" | "miss") for a cache key.
+
+    compute(db) builds the body, on a session opened from `session` (an
+    async context manager factory) by the shared task itself, never on a
+    caller's: shared tasks are shielded, so one caller going away does not
+    cancel the work for the others, and it must not close their session
+    either.
+    """
+    if local is not None:
+        body = local.get(key, kind="page")
+        if body is not None:
+            return body, "fresh"
+
+    compute_body = partial(_run, session, compute)
+
+    value = await cache.get(key)
+    entry = _unwrap(value) if value is not None else None
+    if entry is not None:
+        fresh_until, body = entry
+        now = time.time()
+        if now < fresh_until:
+            if local is not None:
+                local.set(key, body, fresh_until - now)
+            return body, "fresh"
+
+        if key not in _inflight:
+            _start(key, _refresh(cache, local, key, ttl, stale_ttl, compute_body))
+        return body, "stale"
+
+    task = _inflight.get(key)
+    if task is not None and not task.done():
+        SINGLEFLIGHT_REQUESTS.labels("local").inc()
+        body = await asyncio.shield(task)
+        # a refresh that lost its lock or failed returns nothing
+        if body is not None:
+            return body, "miss"
+
+    task = _start(key, _compute_and_store(cache, local, key, ttl, stale_ttl, compute_body))
+    return await asyncio.shield(task), "miss"
@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import itertools
+import logging
+import random
+import re
+import time
+from collections import deque
+from datetime import date, datetime, timezone
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# bound parameters are kept for display this far: list elements, characters
+MAX_PARAM_ITEMS = 20
+MAX_PARAM_CHARS = 200
+
+# statement fingerprint: literals and placeholders become ?, whitespace one
+# space, so the same query with other parameters groups together
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\$\d+|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+# monthly partitions (orders_y2026m09) stand for their parent, so a plan
+# scanning other months still has the same shape
+_PARTITION_SUFFIX = re.compile(r"_y\d{4}m\d{2}$")
+
+# statements that write or lock rows ("for update" is matched by update)
+_WRITES = re.compile(r"\b(insert|update|delete|merge|for share)\b")
+
+# what makes two plans the same plan: never costs, row counts or timings
+PLAN_SHAPE_KEYS = ("Node Type", "Join Type", "Strategy", "Scan Direction", "Relation Name", "Index Name")
+
+
+def _fingerprint(value: str) -> str:
+    return hashlib.sha1(value.encode()).hexdigest()[:12]
+
+
+def statement_fingerprint(statement: str) -> str:
+    return _fingerprint(_WHITESPACE.sub(" ", _LITERALS.sub("?", statement)).strip().lower())
+
+
+def plan_shape(node: dict) -> str:
+    """The plan tree as a string of its node types, join strategies and
+    relations, e.g. "Limit(Index Scan orders idx_orders_created_at)"."""
+    parts = []
+    for key in PLAN_SHAPE_KEYS:
+        value = node.get(key)
+        if value:
+            parts.append(_PARTITION_SUFFIX.sub("", value) if key == "Relation Name" else value)
+
+    children = [plan_shape(child) for child in node.get("Plans", [])]
+    if node.get("Node Type") in ("Append", "Merge Append"):
+        # one entry per distinct partition scan, however many months
+        children = sorted(set(children))
+
+    shape = " ".join(parts)
+    return f"{shape}({', '.join(children)})" if children else shape
+
+
+def _display(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        shown = [_display(v) for v in value[:MAX_PARAM_ITEMS]]
+        if len(value) > MAX_PARAM_ITEMS:
+            shown.append(f"... {len(value) - MAX_PARAM_ITEMS} more")
+        return shown
+    value = str(value)
+    return value if len(value) <= MAX_PARAM_CHARS else value[:MAX_PARAM_CHARS] + "..."
+
+
+def _explainable(statement: str) -> bool:
+    # Only plain reads are re-run: no writes, data-modifying CTEs or row
+    # locks. The read-only transaction the capture runs in would refuse them
+    # anyway.
+    statement = statement.lstrip().lower()
+    return statement.startswith(("select", "with")) and not _WRITES.search(statement)
+
+
+class SlowQueryLog:
+    """Per-worker ring buffer of statements slower than `threshold` seconds.
+
+    Each entry has the statement, its bound parameters, logical query name
+    (query_name), engine and duration. A `sample` fraction of them also get
+    EXPLAIN (ANALYZE, BUFFERS) captured in the background, on a connection of
+    their own outside the pool, in a read-only transaction that is rolled
+    back and bounded by `explain_timeout`. One capture runs at a time;
+    statements slow while one is running are logged without a plan.
+    """
+
+    def __init__(self, size: int, threshold: float, sample: float, explain_timeout: float):
+        self.threshold = threshold
+        self.sample = sample
+        self.explain_timeout = explain_timeout
+        self.entries: deque[dict] = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._explain_engines = {}
+        self._capturing: asyncio.Task | None = None
+
+    def instrument(self, engine, name: str):
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            context._slow_query_start = time.perf_counter()
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - context._slow_query_start
+            if self.threshold > 0 and elapsed >= self.threshold and not executemany:
+                query = context.execution_options.get("query_name", "other")
+                self.record(engine, name, query, statement, parameters, elapsed)
+
+    def record(self, engine, engine_name: str, query: str, statement: str, parameters, elapsed: float):
+        entry = {
+            "id": next(self._ids),
+            "at": datetime.now(timezone.utc),
+            "engine": engine_name,
+            "query": query,
+            "duration_ms": round(elapsed * 1000, 1),
+            "statement": statement,
+            "params": _display(parameters),
+            "fingerprint": statement_fingerprint(statement),
+            "plan": None,
+            "plan_fingerprint": None,
+            "plan_error": None,
+        }
+        self.entries.append(entry)
+
+        if (
+            self.sample > 0
+            and _explainable(statement)
+            and (self._capturing is None or self._capturing.done())
+            and random.random() < self.sample
+        ):
+            # the hook runs in the event loop's thread, inside a running loop
+            # for the async engines
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._capturing = loop.create_task(self._capture(entry, engine, statement, parameters))
+
+    def _explain_engine(self, engine):
+        key = engine.url.render_as_string(hide_password=False)
+        if key not in self._explain_engines:
+            self._explain_engines[key] = create_async_engine(engine.url, poolclass=NullPool)
+        return self._explain_engines[key]
+
+    async def _explain(self, engine, statement: str, parameters):
+        async with self._explain_engine(engine).connect() as conn:
+            transaction = await conn.begin()
+            try:
+                await conn.exec_driver_sql("SET TRANSACTION READ ONLY")
+                await conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(self.explain_timeout * 1000)}")
+                result = await conn.exec_driver_sql(
+                    "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters
+                )
+                return result.scalar()
+            finally:
+                await transaction.rollback()
+
+    async def _capture(self, entry: dict, engine, statement: str, parameters):
+        try:
+            plan = await asyncio.wait_for(self._explain(engine, statement, parameters), self.explain_timeout + 1)
+        except Exception as e:
+            entry["plan_error"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+            logger.warning("EXPLAIN of slow %s failed: %s", entry["query"], entry["plan_error"])
+            return
+
+        entry["plan"] = plan
+        entry["plan_fingerprint"] = _fingerprint(plan_shape(plan[0]["Plan"]))
+
+    def recent(self, query: str | None = None, fingerprint: str | None = None, limit: int = 50) -> list[dict]:
+        """Newest first."""
+        entries = [
+            e
+            for e in reversed(self.entries)
+            if (query is None or e["query"] == query)
+            and (fingerprint is None or fingerprint in (e["fingerprint"], e["plan_fingerprint"]))
+        ]
+        return entries[:limit]
+
+    def groups(self) -> list[dict]:
+        """Entries grouped by query name, statement and plan fingerprint,
+        slowest total first. Entries without a captured plan form their own
+        group per statement."""
+        groups = {}
+        for e in self.entries:
+            key = (e["query"], e["fingerprint"], e["plan_fingerprint"])
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {
+                    "query": e["query"],
+                    "fingerprint": e["fingerprint"],
+                    "plan_fingerprint": e["plan_fingerprint"],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "first_at": e["at"],
+                    "last_at": e["at"],
+                    "last_id": e["id"],
+                }
+            group["count"] += 1
+            group["total_ms"] += e["duration_ms"]
+            group["max_ms"] = max(group["max_ms"], e["duration_ms"])
+            group["last_at"] = e["at"]
+            group["last_id"] = e["id"]
+
+        for group in groups.values():
+            group["mean_ms"] = round(group["total_ms"] / group["count"], 1)
+            group["total_ms"] = round(group["total_ms"], 1)
+
+        return sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)
+
+    def clear(self):
+        self.entries.clear()
+
+
+slow_query_log = SlowQueryLog(
+    settings.SLOW_QUERY_LOG_SIZE,
+    settings.SLOW_QUERY_THRESHOLD,
+    settings.SLOW_QUERY_EXPLAIN_SAMPLE,
+    settings.SLOW_QUERY_EXPLAIN_TIMEOUT,
+)
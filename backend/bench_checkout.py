@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+import psycopg
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.scripts import bump_cache, psycopg_dsn
+from app.routers.users import CheckoutFailed, checkout_cart
+
+# Flash sale benchmark for checkout: many buyers with the same hot product in
+# their carts check out at once, and the orders/sec, latencies and sell-outs
+# are reported.
+#
+#   python bench_checkout.py [--buyers 1000] [--concurrency 50] [--stock 500] [--qty 1] [--keep]
+#
+# Calls checkout_cart directly (no HTTP), one session per buyer on a pool of
+# --concurrency connections, so the numbers are the database's. It adds a
+# product and REPLACES THE CARTS of the first --buyers users: run it against
+# a seeded development database. Afterwards it checks that exactly the stock
+# sold was taken (no overselling) and, unless --keep, deletes the orders,
+# carts and product it created. Exits 1 if the stock doesn't add up.
+
+
+def setup(conn, run: str, buyers: int, stock: int, qty: int) -> tuple[int, list[int]]:
+    user_ids = [r[0] for r in conn.execute("SELECT id FROM users ORDER BY id LIMIT %s", (buyers,))]
+    if len(user_ids) < buyers:
+        raise SystemExit(f"Only {len(user_ids)} users, seed more or lower --buyers.")
+
+    with conn.transaction():
+        (product_id,) = conn.execute(
+            "INSERT INTO products (title, sku, price, stock) VALUES (%s, %s, 100, %s) RETURNING id",
+            (f"Flash sale {run}", f"BENCH-{run}", stock),
+        ).fetchone()
+        conn.execute("DELETE FROM cart_items WHERE user_id = ANY(%s)", (user_ids,))
+        conn.execute(
+            "INSERT INTO cart_items (user_id, product_id, qty) SELECT unnest(%s::int[]), %s, %s",
+            (user_ids, product_id, qty),
+        )
+
+    return product_id, user_ids
+
+
+def cleanup(conn, run: str, product_id: int, user_ids: list[int]):
+    with conn.transaction():
+        order_ids = [
+            r[0]
+            for r in conn.execute(
+                "SELECT order_id FROM checkout_requests WHERE idempotency_key LIKE %s AND order_id IS NOT NULL",
+                (f"bench-{run}-%",),
+            )
+        ]
+        conn.execute("DELETE FROM order_items WHERE order_id = ANY(%s)", (order_ids,))
+        conn.execute("DELETE FROM orders WHERE id = ANY(%s)", (order_ids,))
+        conn.execute("DELETE FROM checkout_requests WHERE idempotency_key LIKE %s", (f"bench-{run}-%",))
+        conn.execute("DELETE FROM cart_items WHERE user_id = ANY(%s)", (user_ids,))
+        conn.execute("DELETE FROM products WHERE id = %s", (product_id,))
+
+
+async def run_buyers(run: str, user_ids: list[int], concurrency: int):
+    """Check every buyer out at once; returns (outcomes, latencies, elapsed)."""
+    engine = create_async_engine(settings.DATABASE_URL, pool_size=concurrency, max_overflow=0)
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession)
+    semaphore = asyncio.Semaphore(concurrency)
+    outcomes = {"placed": 0, "sold_out": 0, "error": 0}
+    latencies = []
+
+    async def buy(user_id: int):
+        async with semaphore, session_factory() as db:
+            started = time.perf_counter()
+            try:
+                await checkout_cart(db, user_id, f"bench-{run}-{user_id}")
+                outcomes["placed"] += 1
+            except CheckoutFailed:
+                outcomes["sold_out"] += 1
+            except Exception as e:
+                outcomes["error"] += 1
+                print(f"buyer {user_id}: {e!r}")
+            latencies.append(time.perf_counter() - started)
+
+    # open the pool first so connection setup isn't timed
+    async with engine.connect():
+        pass
+
+    started = time.perf_counter()
+    await asyncio.gather(*(buy(user_id) for user_id in user_ids))
+    elapsed = time.perf_counter() - started
+
+    await engine.dispose()
+    return outcomes, latencies, elapsed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark concurrent checkouts of one hot product")
+    parser.add_argument("--buyers", type=int, default=1000, help="buyers, one checkout each")
+    parser.add_argument("--concurrency", type=int, default=50, help="checkouts in flight (connections)")
+    parser.add_argument("--stock", type=int, default=500, help="stock of the hot product")
+    parser.add_argument("--qty", type=int, default=1, help="units in each cart")
+    parser.add_argument("--keep", action="store_true", help="keep the orders and product")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    run = str(int(time.time()))
+
+    with psycopg.connect(psycopg_dsn(), autocommit=True) as conn:
+        product_id, user_ids = setup(conn, run, args.buyers, args.stock, args.qty)
+        print(f"{args.buyers} buyers, {args.concurrency} at a time, for {args.stock} units of product {product_id}")
+
+        outcomes, latencies, elapsed = asyncio.run(run_buyers(run, user_ids, args.concurrency))
+
+        (stock,) = conn.execute("SELECT stock FROM products WHERE id = %s", (product_id,)).fetchone()
+        (sold,) = conn.execute(
+            "SELECT COALESCE(SUM(qty), 0) FROM order_items WHERE product_id = %s", (product_id,)
+        ).fetchone()
+
+        if not args.keep:
+            cleanup(conn, run, product_id, user_ids)
+        asyncio.run(bump_cache(["pending"]))
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"placed {outcomes['placed']}, sold out {outcomes['sold_out']}, errors {outcomes['error']} "
+        f"in {elapsed:.2f}s: {outcomes['placed'] / elapsed:.0f} orders/s, "
+        f"{len(latencies) / elapsed:.0f} checkouts/s"
+    )
+    print(
+        f"latency p50 {quantiles[49] * 1000:.1f}ms  p95 {quantiles[94] * 1000:.1f}ms  "
+        f"p99 {quantiles[98] * 1000:.1f}ms"
+    )
+
+    expected_sold = outcomes["placed"] * args.qty
+    if sold != expected_sold or stock != args.stock - sold or stock < 0:
+        print(f"Stock mismatch: {sold} sold for {outcomes['placed']} orders, {stock} left of {args.stock}.")
+        return 1
+
+    print(f"Stock consistent: {sold} sold, {stock} left.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
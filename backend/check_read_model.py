@@ -0,0 +1,106 @@
+import argparse
+import sys
+import time
+
+import psycopg
+
+from app.db.scripts import psycopg_dsn
+
+# Compares the order_list_rows read model with its definition, the
+# order_list_rows_source view, and reports drift:
+#
+#   python check_read_model.py [--batch 50000] [--show 20] [--fix]
+#
+#   missing    order exists, no read model row
+#   orphaned   read model row for an order that no longer exists
+#   stale      both exist but differ
+#
+# Orders are compared in order_id ranges, each range in a single statement,
+# so concurrent writes (which update both sides in one transaction) never
+# show up as drift. --fix rebuilds or deletes the drifted rows. Exits 1 when
+# drift was found, so it can run from cron or CI.
+
+COLUMNS = ["user_id", "status", "total", "created_at", "user_name", "user_email", "item_count", "items"]
+
+DRIFT_SQL = f"""
+    SELECT
+        COALESCE(s.order_id, r.order_id) AS order_id,
+        CASE
+            WHEN r.order_id IS NULL THEN 'missing'
+            WHEN s.order_id IS NULL THEN 'orphaned'
+            ELSE 'stale'
+        END AS drift
+    FROM (
+        SELECT * FROM order_list_rows_source WHERE order_id >= %(low)s AND order_id < %(high)s
+    ) s
+    FULL JOIN (
+        SELECT * FROM order_list_rows WHERE order_id >= %(low)s AND order_id < %(high)s
+    ) r ON r.order_id = s.order_id
+    WHERE s.order_id IS NULL
+       OR r.order_id IS NULL
+       OR ({", ".join(f"s.{c}" for c in COLUMNS)}) IS DISTINCT FROM ({", ".join(f"r.{c}" for c in COLUMNS)})
+    ORDER BY 1
+"""
+
+DRIFT_KINDS = ["missing", "orphaned", "stale"]
+
+
+def find_drift(conn, batch: int) -> dict[str, list[int]]:
+    drift = {kind: [] for kind in DRIFT_KINDS}
+
+    low, high = conn.execute(
+        """
+        SELECT LEAST(o.low, r.low), GREATEST(o.high, r.high)
+        FROM (SELECT MIN(id) AS low, MAX(id) AS high FROM orders) o,
+             (SELECT MIN(order_id) AS low, MAX(order_id) AS high FROM order_list_rows) r
+        """
+    ).fetchone()
+    if low is None:
+        return drift
+
+    for start in range(low, high + 1, batch):
+        rows = conn.execute(DRIFT_SQL, {"low": start, "high": start + batch}).fetchall()
+        for order_id, kind in rows:
+            drift[kind].append(order_id)
+
+    return drift
+
+
+def fix_drift(conn, drift: dict[str, list[int]]):
+    with conn.transaction():
+        conn.execute("DELETE FROM order_list_rows WHERE order_id = ANY(%s)", (drift["orphaned"],))
+        conn.execute("SELECT order_list_rows_refresh(%s)", (drift["missing"] + drift["stale"],))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Report drift between order_list_rows and its source tables")
+    parser.add_argument("--batch", type=int, default=50_000, help="order ids compared per statement")
+    parser.add_argument("--show", type=int, default=20, help="order ids listed per kind of drift")
+    parser.add_argument("--fix", action="store_true", help="rebuild or delete drifted rows")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    started = time.perf_counter()
+
+    with psycopg.connect(psycopg_dsn(), autocommit=True) as conn:
+        drift = find_drift(conn, args.batch)
+        total = sum(len(ids) for ids in drift.values())
+
+        for kind in DRIFT_KINDS:
+            ids = drift[kind]
+            shown = ", ".join(str(i) for i in ids[: args.show])
+            more = f" (+{len(ids) - args.show} more)" if len(ids) > args.show else ""
+            print(f"{kind:>9}: {len(ids)}" + (f"  {shown}{more}" if ids else ""))
+
+        if total and args.fix:
+            fix_drift(conn, drift)
+            print(f"Fixed {total} rows.")
+
+    print(f"Checked in {time.perf_counter() - started:.1f}s.")
+    return 1 if total else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import sys
+from datetime import date
+
+import psycopg
+
+from app.db.partitions import (
+    IS_PARTITIONED_SQL,
+    LIST_PARTITIONS_SQL,
+    PARTITION_MONTHS_AHEAD,
+    PARTITIONED_TABLES,
+    add_months,
+    create_partition_sql,
+    current_month,
+    month_start,
+    months,
+    partition_name,
+)
+from app.db.scripts import bump_cache, psycopg_dsn
+
+# Monthly partitions of orders and order_items:
+#
+#   python manage_partitions.py list
+#   python manage_partitions.py create [--ahead 3]
+#   python manage_partitions.py detach --before 2024-01 [--drop]
+#
+# create adds the current month and --ahead months after it, skipping
+# existing ones; run it from cron well before a month starts, as there is no
+# default partition to catch rows past the last one. It takes a brief
+# exclusive lock on each parent and gives up after LOCK_TIMEOUT rather than
+# queue behind long-running queries (and block everything queued behind it).
+#
+# detach detaches every month before --before from both tables, items first
+# (they reference their orders), CONCURRENTLY, so reads and writes to the
+# other months carry on. The detached pair are left as plain tables with
+# only a foreign key between them, ready to dump and drop (--drop drops
+# them). Rows of the trigger-maintained tables built from them (order_search,
+# order_list_rows) are deleted, and cached orders lists invalidated. An
+# interrupted concurrent detach leaves the partition pending: finish it with
+# ALTER TABLE <parent> DETACH PARTITION <partition> FINALIZE and rerun.
+
+LOCK_TIMEOUT = "5s"
+
+DERIVED_TABLES = ["order_search", "order_list_rows"]
+
+
+def _month(value: str) -> date:
+    try:
+        year, month = value.split("-")
+        return date(int(year), int(month), 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {value!r}")
+
+
+def partitions(conn, table: str) -> list[tuple[str, date, int]]:
+    """(name, month, estimated rows) of each partition, oldest first."""
+    return [
+        (name, month_start(lower), rows)
+        for name, lower, rows in conn.execute(LIST_PARTITIONS_SQL, (table,)).fetchall()
+    ]
+
+
+def create_partitions(conn, first: date, last: date) -> list[str]:
+    """Create the partitions of every month from first to last, returning
+    the names of those that did not exist yet."""
+    existing = {name for table in PARTITIONED_TABLES for name, _, _ in partitions(conn, table)}
+    created = []
+
+    for month in months(first, last):
+        for table in PARTITIONED_TABLES:
+            name = partition_name(table, month)
+            if name not in existing:
+                with conn.transaction():
+                    conn.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+                    conn.execute(create_partition_sql(table, month))
+                created.append(name)
+
+    return created
+
+
+def _drop_foreign_keys(conn, table: str):
+    for (constraint,) in conn.execute(
+        "SELECT conname FROM pg_constraint WHERE conrelid = CAST(%s AS regclass) AND contype = 'f'",
+        (table,),
+    ).fetchall():
+        conn.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{constraint}"')
+
+
+def detach_month(conn, month: date, drop: bool):
+    orders, items = (partition_name(table, month) for table in PARTITIONED_TABLES)
+
+    # a detached partition keeps copies of the parent's foreign keys; they
+    # are dropped so the archive references nothing live (the items' key
+    # would also block detaching their orders)
+    for table in reversed(PARTITIONED_TABLES):
+        name = partition_name(table, month)
+        conn.execute(f"ALTER TABLE {table} DETACH PARTITION {name} CONCURRENTLY")
+        _drop_foreign_keys(conn, name)
+
+    with conn.transaction():
+        for table in DERIVED_TABLES:
+            if conn.execute("SELECT to_regclass(%s)", (table,)).fetchone()[0] is not None:
+                conn.execute(f"DELETE FROM {table} WHERE order_id IN (SELECT id FROM {orders})")
+
+        if drop:
+            conn.execute(f"DROP TABLE {items}, {orders}")
+        else:
+            conn.execute(
+                f"ALTER TABLE {items} ADD CONSTRAINT {items}_order_id_fkey "
+                f"FOREIGN KEY (order_id, created_at) REFERENCES {orders} (id, created_at)"
+            )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Create, list and detach monthly order partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="partitions with their estimated row counts")
+
+    create = commands.add_parser("create", help="create the coming months' partitions")
+    create.add_argument("--ahead", type=int, default=PARTITION_MONTHS_AHEAD, help="months past the current one")
+
+    detach = commands.add_parser("detach", help="detach the months before --before")
+    detach.add_argument("--before", type=_month, required=True, help="first month kept, YYYY-MM")
+    detach.add_argument("--drop", action="store_true", help="drop the detached tables")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    with psycopg.connect(psycopg_dsn(), autocommit=True) as conn:
+        if not conn.execute(IS_PARTITIONED_SQL, ("orders",)).fetchone()[0]:
+            print("orders is not partitioned; run the migrations first.")
+            return 1
+
+        if args.command == "list":
+            for table in PARTITIONED_TABLES:
+                for name, month, rows in partitions(conn, table):
+                    print(f"{name:<24} {month:%Y-%m}  ~{max(rows, 0)} rows")
+
+        elif args.command == "create":
+            first = current_month()
+            created = create_partitions(conn, first, add_months(first, args.ahead))
+            print(f"Created {len(created)} partitions" + (f": {', '.join(created)}" if created else "."))
+
+        elif args.command == "detach":
+            if args.before > current_month():
+                print("Refusing to detach the current month or later.")
+                return 1
+
+            old = [month for _, month, _ in partitions(conn, "orders") if month < args.before]
+            for month in old:
+                print(f"Detaching {month:%Y-%m}...")
+                detach_month(conn, month, args.drop)
+
+            if old:
+                asyncio.run(bump_cache())
+            print(f"Detached {len(old)} months" + (" and dropped them." if args.drop else "."))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,19 @@
+import argparse
 import asyncio
 import random
 import string
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import insert, text
 
+from app.db.scripts import bump_cache
 from app.db.session import get_engine
 from app.models.user import User
 from app.models.product import Product
 from app.models.order import Order
 from app.models.order_item import OrderItem
 
+import seed_copy
+
 
 def random_string(n=6):
     return "".join(random.choices(string.ascii_lowercase, k=n))
@@ -128,16 +132,17 @@ async def seed_orders(
 
         if len(orders_batch) >= batch_size:
             result = await session.execute(
-                insert(Order).returning(Order.id),
+                insert(Order).returning(Order.id, Order.created_at),
                 orders_batch
             )
-            order_ids = [r[0] for r in result]
 
+            # items carry their order's created_at, the partition key
             flat_items = []
-            for oid, order_items in zip(order_ids, items_batch):
+            for (oid, created_at), order_items in zip(result, items_batch):
                 for item in order_items:
                     flat_items.append({
                         "order_id": oid,
+                        "created_at": created_at,
                         **item
                     })
 
@@ -152,16 +157,16 @@ async def seed_orders(
 
     if orders_batch:
         result = await session.execute(
-            insert(Order).returning(Order.id),
+            insert(Order).returning(Order.id, Order.created_at),
             orders_batch
         )
-        order_ids = [r[0] for r in result]
 
         flat_items = []
-        for oid, order_items in zip(order_ids, items_batch):
+        for (oid, created_at), order_items in zip(result, items_batch):
             for item in order_items:
                 flat_items.append({
                     "order_id": oid,
+                    "created_at": created_at,
                     **item
                 })
 
@@ -178,8 +183,23 @@ async def main():
         await seed_products(session)
         await seed_orders(session)
 
+    # every cached orders list is now stale
+    await bump_cache()
+
     print("Seeding complete.")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Seed the admin database")
+    parser.add_argument(
+        "--mode",
+        choices=["orm", "copy"],
+        default="orm",
+        help="copy: NumPy + binary COPY bulk load, see seed_copy.py --help",
+    )
+    args, rest = parser.parse_known_args()
+
+    if args.mode == "copy":
+        seed_copy.main(rest)
+    else:
+        asyncio.run(main())
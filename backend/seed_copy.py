@@ -0,0 +1,430 @@
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import psycopg
+
+from app.db.partitions import IS_PARTITIONED_SQL, PARTITION_MONTHS_AHEAD, add_months, current_month, month_start
+from app.db.scripts import bump_cache, psycopg_dsn
+from manage_partitions import create_partitions
+
+# Bulk seeding for benchmark-sized datasets:
+#
+#   python seed_copy.py --users 1000000 --products 50000 --orders 10000000
+#
+# Columns are generated with NumPy and packed straight into PostgreSQL's binary
+# COPY format, so no Python object is built per row. Orders are produced in
+# fixed-size chunks, each with its own random stream derived from --seed, and
+# loaded by a pool of writer processes; the dataset depends only on --seed and
+# the scale flags, never on --workers.
+#
+# The tables are TRUNCATEd first, with cart_items and checkout_requests (when
+# its migration has run). Secondary indexes and foreign keys are dropped for
+# the load and rebuilt afterwards. Trigger-maintained tables derived from them
+# (DERIVED_TABLES, when their migration has run) are truncated too, their
+# triggers are disabled during the load, and each is rebuilt in one set-based
+# statement at the end. When orders is partitioned, the monthly orders and
+# order_items partitions covering --days are created before the load.
+
+TABLES = ["users", "products", "orders", "order_items"]
+
+DERIVED_TABLES = {
+    "order_search": "INSERT INTO order_search SELECT * FROM order_search_rows(NULL)",
+    "order_list_rows": "INSERT INTO order_list_rows SELECT * FROM order_list_rows_source",
+}
+
+# emptied with the tables above, when their migration has run
+CLEARED_TABLES = ["checkout_requests"]
+
+STATUSES = ["pending", "processing", "shipped", "completed", "cancelled"]
+
+ORDERS_PER_CHUNK = 100_000
+MAX_ITEMS_PER_ORDER = 5
+
+# bounded Zipf exponents: a few customers and products account for a large
+# share of orders, the long tail for the rest
+CUSTOMER_SKEW = 0.8
+PRODUCT_SKEW = 1.0
+
+# status mix by order age in days, newest bucket first
+STATUS_BY_AGE = [
+    (2, [0.55, 0.35, 0.0, 0.0, 0.10]),
+    (10, [0.02, 0.13, 0.65, 0.15, 0.05]),
+    (None, [0.0, 0.0, 0.02, 0.90, 0.08]),
+]
+
+# random streams, combined with --seed (and the chunk index for orders)
+USERS, PRODUCTS, ITEM_COUNTS, ORDERS = range(4)
+
+PG_EPOCH_US = 946_684_800_000_000  # 2000-01-01 UTC, the binary timestamptz epoch
+DAY_US = 86_400_000_000
+
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + (0).to_bytes(4, "big") + (0).to_bytes(4, "big")
+COPY_TRAILER = (-1).to_bytes(2, "big", signed=True)
+
+
+def _rng(seed: int, *stream: int) -> np.random.Generator:
+    return np.random.default_rng([seed, *stream])
+
+
+def _copy_rows(columns) -> bytes:
+    """Pack (values, dtype) columns into binary COPY tuples.
+
+    Every field must be fixed width within one call; text columns are passed
+    as equal-length bytes ("S<n>"), which is why callers group rows by length.
+    """
+    fields = [("count", ">i2")]
+    for i, (_, dtype) in enumerate(columns):
+        fields += [(f"len{i}", ">i4"), (f"col{i}", dtype)]
+
+    rows = np.empty(len(columns[0][0]), dtype=np.dtype(fields))
+    rows["count"] = len(columns)
+    for i, (values, dtype) in enumerate(columns):
+        rows[f"len{i}"] = np.dtype(dtype).itemsize
+        rows[f"col{i}"] = values
+
+    return rows.tobytes()
+
+
+def _digit_ranges(n: int):
+    """Split 0..n-1 into ranges whose numbers all have the same digit count."""
+    start, bound = 0, 10
+    while start < n:
+        stop = min(n, bound)
+        yield start, stop
+        start, bound = stop, bound * 10
+
+
+def _numbered(prefix: bytes, numbers: np.ndarray, digits: int, suffix: bytes = b"") -> np.ndarray:
+    text = np.char.add(prefix, numbers.astype(f"S{digits}"))
+    return np.char.add(text, suffix) if suffix else text
+
+
+def _random_letters(rng: np.random.Generator, n: int, k: int) -> np.ndarray:
+    return rng.integers(ord("a"), ord("z") + 1, size=(n, k), dtype=np.uint8).view(f"S{k}").ravel()
+
+
+def _zipf_cdf(n: int, skew: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1, dtype=np.float64) ** skew
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+
+def _product_prices(seed: int, n: int) -> np.ndarray:
+    prices = _rng(seed, PRODUCTS, 0).lognormal(mean=4.5, sigma=0.8, size=n)
+    return np.clip(prices, 10, 500).astype(np.int32)
+
+
+def _copy(conn, table: str, columns: str, chunks):
+    with conn.cursor() as cur:
+        with cur.copy(f"COPY {table} ({columns}) FROM STDIN (FORMAT BINARY)") as copy:
+            copy.write(COPY_HEADER)
+            for chunk in chunks:
+                copy.write(chunk)
+            copy.write(COPY_TRAILER)
+
+
+# --------------------
+# Users and products
+# --------------------
+def load_users(conn, seed: int, total: int, start_us: int, span_us: int):
+    print(f"Copying {total} users...")
+    rng = _rng(seed, USERS, 0)
+    created_at = start_us + rng.integers(0, span_us, size=total, dtype=np.int64) - PG_EPOCH_US
+
+    def chunks():
+        for start, stop in _digit_ranges(total):
+            digits = len(str(start))
+            numbers = np.arange(start, stop)
+            email = _numbered(b"user", numbers, digits, b"@example.com")
+            name = _numbered(b"User ", numbers, digits)
+            yield _copy_rows([
+                (numbers + 1, ">i4"),
+                (email, email.dtype.str),
+                (name, name.dtype.str),
+                (created_at[start:stop], ">i8"),
+            ])
+
+    _copy(conn, "users", "id, email, name, created_at", chunks())
+
+
+def load_products(conn, seed: int, total: int, start_us: int):
+    print(f"Copying {total} products...")
+    prices = _product_prices(seed, total)
+    stock = _rng(seed, PRODUCTS, 1).integers(0, 501, size=total, dtype=np.int32)
+    titles = np.char.add(b"Product ", _random_letters(_rng(seed, PRODUCTS, 2), total, 6))
+    sku_tags = _random_letters(_rng(seed, PRODUCTS, 3), total, 4)
+    created_at = np.full(total, start_us - PG_EPOCH_US, dtype=np.int64)
+
+    def chunks():
+        for start, stop in _digit_ranges(total):
+            digits = len(str(start))
+            numbers = np.arange(start, stop)
+            sku = np.char.add(_numbered(b"SKU-", numbers, digits, b"-"), sku_tags[start:stop])
+            yield _copy_rows([
+                (numbers + 1, ">i4"),
+                (titles[start:stop], titles.dtype.str),
+                (sku, sku.dtype.str),
+                (prices[start:stop], ">i4"),
+                (stock[start:stop], ">i4"),
+                (created_at[start:stop], ">i8"),
+            ])
+
+    _copy(conn, "products", "id, title, sku, price, stock, created_at", chunks())
+
+
+# --------------------
+# Orders (parallel writers)
+# --------------------
+_worker = {}
+
+
+def _init_worker(dsn: str, seed: int, users: int, products: int):
+    # per-process state, built once: a writer connection, product prices and
+    # the popularity tables (Zipf rank -> id, shuffled so the busiest
+    # customers and products aren't simply the lowest ids)
+    _worker["conn"] = psycopg.connect(dsn)
+    _worker["prices"] = _product_prices(seed, products)
+    _worker["user_cdf"] = _zipf_cdf(users, CUSTOMER_SKEW)
+    _worker["user_ids"] = _rng(seed, USERS, 1).permutation(users).astype(np.int32) + 1
+    _worker["product_cdf"] = _zipf_cdf(products, PRODUCT_SKEW)
+    _worker["product_ids"] = _rng(seed, PRODUCTS, 4).permutation(products).astype(np.int32) + 1
+
+
+def _zipf_pick(rng: np.random.Generator, cdf: np.ndarray, ids: np.ndarray, n: int) -> np.ndarray:
+    ranks = np.searchsorted(cdf, rng.random(n), side="right")
+    return ids[np.minimum(ranks, len(ids) - 1)]
+
+
+def _order_statuses(rng: np.random.Generator, age_days: np.ndarray) -> np.ndarray:
+    statuses = np.empty(len(age_days), dtype=np.int8)
+    remaining = np.ones(len(age_days), dtype=bool)
+
+    for max_age, weights in STATUS_BY_AGE:
+        bucket = remaining if max_age is None else remaining & (age_days < max_age)
+        cdf = np.cumsum(weights)
+        picks = np.searchsorted(cdf / cdf[-1], rng.random(bucket.sum()), side="right")
+        statuses[bucket] = np.minimum(picks, len(STATUSES) - 1)
+        remaining &= ~bucket
+
+    return statuses
+
+
+def _copy_orders_chunk(job):
+    chunk, first_id, first_item_id, item_counts, total_orders, start_us, span_us, end_us, seed = job
+    rng = _rng(seed, ORDERS, chunk)
+    n = len(item_counts)
+    n_items = int(item_counts.sum())
+
+    order_ids = np.arange(first_id, first_id + n, dtype=np.int32)
+    user_ids = _zipf_pick(rng, _worker["user_cdf"], _worker["user_ids"], n)
+
+    # ids follow time as they would in production, with order volume growing
+    # linearly over the window
+    q = (order_ids - 1 + rng.random(n)) / total_orders
+    created_us = start_us + (span_us * np.sqrt(q)).astype(np.int64)
+    statuses = _order_statuses(rng, (end_us - created_us) / DAY_US)
+
+    product_ids = _zipf_pick(rng, _worker["product_cdf"], _worker["product_ids"], n_items)
+    qty = (1 + rng.binomial(2, 0.25, size=n_items)).astype(np.int32)
+    unit_price = _worker["prices"][product_ids - 1]
+    first_item = np.cumsum(item_counts) - item_counts
+    totals = np.add.reduceat(qty * unit_price, first_item).astype(np.int32)
+
+    created_at = created_us - PG_EPOCH_US
+    order_chunks = []
+    # binary tuples need a fixed-width status per call, so rows are grouped
+    # by status within small blocks to keep the physical order close to id
+    for block in range(0, n, 10_000):
+        rows = slice(block, block + 10_000)
+        for code, status in enumerate(STATUSES):
+            mask = statuses[rows] == code
+            if not mask.any():
+                continue
+            order_chunks.append(_copy_rows([
+                (order_ids[rows][mask], ">i4"),
+                (user_ids[rows][mask], ">i4"),
+                (status.encode(), f"S{len(status)}"),
+                (totals[rows][mask], ">i4"),
+                (created_at[rows][mask], ">i8"),
+            ]))
+
+    items = _copy_rows([
+        (np.arange(first_item_id, first_item_id + n_items, dtype=np.int32), ">i4"),
+        (np.repeat(order_ids, item_counts), ">i4"),
+        (product_ids, ">i4"),
+        (qty, ">i4"),
+        (unit_price, ">i4"),
+        (np.repeat(created_at, item_counts), ">i8"),
+    ])
+
+    conn = _worker["conn"]
+    _copy(conn, "orders", "id, user_id, status, total, created_at", order_chunks)
+    _copy(conn, "order_items", "id, order_id, product_id, qty, unit_price, created_at", [items])
+    conn.commit()
+    return n, n_items
+
+
+def load_orders(dsn: str, args, start_us: int, span_us: int, end_us: int):
+    print(f"Copying {args.orders} orders with {args.workers} writers...")
+
+    jobs = []
+    first_item_id = 1
+    for chunk, first in enumerate(range(0, args.orders, ORDERS_PER_CHUNK)):
+        n = min(ORDERS_PER_CHUNK, args.orders - first)
+        counts = 1 + _rng(args.seed, ITEM_COUNTS, chunk).binomial(MAX_ITEMS_PER_ORDER - 1, 0.3, size=n)
+        jobs.append((chunk, first + 1, first_item_id, counts, args.orders, start_us, span_us, end_us, args.seed))
+        first_item_id += int(counts.sum())
+
+    done = items = 0
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(dsn, args.seed, args.users, args.products),
+    ) as pool:
+        for n, n_items in pool.map(_copy_orders_chunk, jobs):
+            done += n
+            items += n_items
+            print(f"Copied {done} orders, {items} items...")
+
+
+# --------------------
+# Indexes and constraints
+# --------------------
+def _exists(conn, table: str) -> bool:
+    return conn.execute("SELECT to_regclass(%s)", (table,)).fetchone()[0] is not None
+
+
+def existing_derived_tables(conn) -> dict[str, str]:
+    return {table: rebuild for table, rebuild in DERIVED_TABLES.items() if _exists(conn, table)}
+
+
+def drop_indexes_and_keys(conn, tables):
+    """Drop secondary indexes and foreign keys, returning what to recreate.
+
+    Primary keys and unique constraints stay, so duplicate ids or emails
+    still fail the load instead of the rebuild. On partitioned tables these
+    are the parents' indexes and keys, which cover every partition.
+    """
+    indexes = conn.execute(
+        """
+        SELECT i.indexrelid::regclass::text, replace(pg_get_indexdef(i.indexrelid), ' ON ONLY ', ' ON ')
+        FROM pg_index i
+        WHERE i.indrelid = ANY(CAST(%s AS regclass[]))
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_constraint c
+              WHERE c.conindid = i.indexrelid AND c.conrelid = i.indrelid
+          )
+        """,
+        (tables,),
+    ).fetchall()
+
+    foreign_keys = conn.execute(
+        """
+        SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE contype = 'f' AND conrelid = ANY(CAST(%s AS regclass[])) AND conparentid = 0
+        """,
+        (tables,),
+    ).fetchall()
+
+    for table, name, _ in foreign_keys:
+        conn.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')
+    for name, _ in indexes:
+        conn.execute(f"DROP INDEX {name}")
+
+    return [definition for _, definition in indexes], foreign_keys
+
+
+def _create_index(dsn: str, definition: str):
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        conn.execute("SET maintenance_work_mem = '512MB'")
+        conn.execute(definition)
+
+
+def rebuild_indexes_and_keys(conn, dsn: str, indexes, foreign_keys, workers: int):
+    print(f"Rebuilding {len(indexes)} indexes and {len(foreign_keys)} foreign keys...")
+
+    # index builds on different tables don't block each other
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda definition: _create_index(dsn, definition), indexes))
+
+    for table, name, definition in foreign_keys:
+        conn.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+
+
+def reset_sequences(conn):
+    for table in TABLES:
+        conn.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="COPY-based bulk seeding")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--products", type=int, default=5_000)
+    parser.add_argument("--orders", type=int, default=85_000)
+    parser.add_argument("--days", type=int, default=730, help="history window for created_at")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    dsn = psycopg_dsn()
+    started = time.perf_counter()
+
+    end_us = int(time.time()) * 1_000_000
+    span_us = args.days * DAY_US
+    start_us = end_us - span_us
+
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        derived = existing_derived_tables(conn)
+
+        print("Truncating tables...")
+        cleared = [table for table in CLEARED_TABLES if _exists(conn, table)]
+        truncate = ["order_items", "orders", "cart_items", *cleared, "products", "users", *derived]
+        conn.execute(f"TRUNCATE {', '.join(truncate)} RESTART IDENTITY")
+        if conn.execute(IS_PARTITIONED_SQL, ("orders",)).fetchone()[0]:
+            create_partitions(
+                conn,
+                month_start(datetime.fromtimestamp(start_us / 1_000_000, timezone.utc)),
+                add_months(current_month(), PARTITION_MONTHS_AHEAD),
+            )
+        indexes, foreign_keys = drop_indexes_and_keys(conn, TABLES + list(derived))
+
+        for table in TABLES:
+            conn.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+
+        try:
+            with conn.transaction():
+                load_users(conn, args.seed, args.users, start_us, span_us)
+                load_products(conn, args.seed, args.products, start_us)
+            load_orders(dsn, args, start_us, span_us, end_us)
+
+            for table, rebuild in derived.items():
+                print(f"Rebuilding {table}...")
+                conn.execute(rebuild)
+        finally:
+            for table in TABLES:
+                conn.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+            rebuild_indexes_and_keys(conn, dsn, indexes, foreign_keys, args.workers)
+
+        reset_sequences(conn)
+        print("Analyzing...")
+        conn.execute(f"ANALYZE {', '.join(TABLES + list(derived))}")
+
+    # every cached orders list is now stale
+    asyncio.run(bump_cache())
+
+    print(f"Seeding complete in {time.perf_counter() - started:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import { proxyGet } from "@/lib/proxy";
+
+export async function GET(req: Request, { params }: { params: Promise<{ id: string }> }) {
+  const { id } = await params;
+
+  return proxyGet(req, `/orders/${encodeURIComponent(id)}`);
+}
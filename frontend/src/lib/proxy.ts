@@ -0,0 +1,32 @@
+import { NextResponse } from "next/server";
+
+// Validators and cache state the backend sets; forwarded both ways so the
+// browser can revalidate with If-None-Match and get a bodiless 304
+const PASSTHROUGH_HEADERS = ["etag", "cache-control", "x-cache"];
+
+export async function proxyGet(req: Request, path: string) {
+  const backendUrl = `${process.env.NEXT_PUBLIC_API_URL}${path}`;
+
+  const headers: Record<string, string> = {};
+  const ifNoneMatch = req.headers.get("if-none-match");
+  if (ifNoneMatch) headers["If-None-Match"] = ifNoneMatch;
+
+  const res = await fetch(backendUrl, {
+    cache: "no-store",
+    headers,
+  });
+
+  const outHeaders = new Headers();
+  for (const name of PASSTHROUGH_HEADERS) {
+    const value = res.headers.get(name);
+    if (value) outHeaders.set(name, value);
+  }
+
+  if (res.status === 304) {
+    return new NextResponse(null, { status: 304, headers: outHeaders });
+  }
+
+  // pass the body through untouched, re-encoding it would break the ETag
+  outHeaders.set("content-type", res.headers.get("content-type") ?? "application/json");
+  return new NextResponse(await res.arrayBuffer(), { status: res.status, headers: outHeaders });
+}